@@ -0,0 +1,192 @@
+# backend/admission.py
+"""
+Admission control: turn excess work away quickly rather than letting every
+request slow down together. Limits are per worker process.
+
+Concurrency gates cap how much of an endpoint runs at once:
+
+    @posts_bp.get("/posts")
+    @concurrency_limit("feeds", capacity=8, cost=_feed_cost)
+    def list_posts(): ...
+
+Each running request holds `cost()` units of the gate (1 by default, at
+most the whole gate), so one unpaginated feed counts like several small
+ones. A request that does not fit waits up to ADMISSION_QUEUE_TIMEOUT
+seconds, behind at most ADMISSION_MAX_QUEUE others, and then gets
+503 with a Retry-After header. Big requests need more free units, so they
+are the first to be shed under load.
+
+Token buckets cap how often one client may call a write endpoint:
+
+    @posts_bp.post("/posts")
+    @requires_auth
+    @rate_limit("posts", "10/60")      # 10 requests per 60 s, bursts of 10
+    def create_post(): ...
+
+The client is the signed-in user (so rate_limit goes below requires_auth),
+else the client IP; pass `key=` to count by something else. An empty
+bucket gets 429 with Retry-After.
+
+Views that pass the same name share one gate or one set of buckets.
+Both can be changed without code: ADMISSION_<NAME>=<capacity> and
+RATE_LIMIT_<NAME>=<requests>/<seconds>, where "0" turns the limit off.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import g, jsonify, request
+
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "0.5"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "16"))
+# clients whose buckets are remembered (least recently seen dropped first)
+RATE_LIMIT_CLIENTS = int(os.getenv("RATE_LIMIT_CLIENTS", "10000"))
+
+
+class Gate:
+    """`capacity` units shared by the requests running one endpoint."""
+
+    def __init__(self, capacity, max_queue=ADMISSION_MAX_QUEUE, timeout=ADMISSION_QUEUE_TIMEOUT):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.used = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, cost=1) -> bool:
+        cost = min(cost, self.capacity)
+        with self._cond:
+            if self.used + cost <= self.capacity:
+                self.used += cost
+                return True
+            if self.waiting >= self.max_queue:
+                return False
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.timeout
+                while self.used + cost > self.capacity:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                self.used += cost
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self, cost=1):
+        with self._cond:
+            self.used -= min(cost, self.capacity)
+            self._cond.notify_all()
+
+
+class TokenBuckets:
+    """One bucket of `burst` tokens per client key, refilled at `rate` tokens/s."""
+
+    def __init__(self, burst, rate, max_clients=RATE_LIMIT_CLIENTS, clock=time.monotonic):
+        self.burst = burst
+        self.rate = rate
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets = OrderedDict()   # key -> [tokens, last refill time]
+        self._lock = threading.Lock()
+
+    def take(self, key) -> float:
+        """Spend one token; returns 0 if allowed, else seconds until one is available."""
+        now = self._clock()
+        with self._lock:
+            b = self._buckets.get(key)
+            if b is None:
+                b = self._buckets[key] = [float(self.burst), now]
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                b[0] = min(self.burst, b[0] + (now - b[1]) * self.rate)
+                b[1] = now
+            if b[0] >= 1:
+                b[0] -= 1
+                return 0.0
+            return (1 - b[0]) / self.rate
+
+
+_gates = {}     # name -> Gate, or None when turned off
+_limits = {}    # name -> TokenBuckets, or None when turned off
+
+
+def _setting(name, prefix, default):
+    return os.getenv(f"{prefix}_{name.upper()}", str(default))
+
+
+def _busy(retry_after, status, message):
+    return jsonify({"error": message}), status, {"Retry-After": str(max(1, math.ceil(retry_after)))}
+
+
+def concurrency_limit(name, capacity, cost=None):
+    """Decorator: at most `capacity` cost units of this view run at once (503 beyond that)."""
+    if name not in _gates:
+        capacity = int(_setting(name, "ADMISSION", capacity))
+        _gates[name] = Gate(capacity) if capacity > 0 else None
+    gate = _gates[name]
+
+    def decorator(f):
+        if gate is None:
+            return f
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            units = cost() if cost else 1
+            if not gate.acquire(units):
+                return _busy(gate.timeout, 503, "Server busy, try again shortly")
+            try:
+                return f(*args, **kwargs)
+            finally:
+                gate.release(units)
+
+        wrapper.gate = gate
+        return wrapper
+
+    return decorator
+
+
+def client_key():
+    """The signed-in user's sub when there is one, else the client IP."""
+    user = g.get("current_user") or {}
+    return user.get("sub") or f"ip:{request.remote_addr}"
+
+
+def parse_rate(spec):
+    """'10/60' -> (10, 60.0): 10 requests per 60 seconds. '0' -> None (no limit)."""
+    count, _, seconds = str(spec).partition("/")
+    count = int(count)
+    if count <= 0:
+        return None
+    return count, float(seconds or 1)
+
+
+def rate_limit(name, default, key=client_key):
+    """Decorator: at most `default` ("<requests>/<seconds>") calls per client (429 beyond that)."""
+    if name not in _limits:
+        rate = parse_rate(_setting(name, "RATE_LIMIT", default))
+        _limits[name] = TokenBuckets(rate[0], rate[0] / rate[1]) if rate else None
+    buckets = _limits[name]
+
+    def decorator(f):
+        if buckets is None:
+            return f
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            wait = buckets.take(key())
+            if wait:
+                return _busy(wait, 429, "Too many requests")
+            return f(*args, **kwargs)
+
+        wrapper.buckets = buckets
+        return wrapper
+
+    return decorator
@@ -1,50 +1,140 @@
 # backend/app.py
+"""
+Application factory:
+
+    from app import create_app, warmup
+    app = create_app()     # routes and hooks only: no DB, no network
+    warmup(app)            # optional: schema, DB pool, tag trie, JWKS
+
+Importing this module (or calling create_app) opens no connections, so
+tools and scripts that only need the app object start quickly and without
+Postgres. Without warmup() each piece is set up on first use instead: the
+schema by db.get_db(), the tag trie by ensure_tag_trie(), JWKS and the JWT
+libraries by the first authenticated request.
+
+`flask run` finds create_app() by itself; wsgi.py and asgi.py build the
+app for the production servers and warm it up before taking traffic.
+"""
 from dotenv import load_dotenv
-load_dotenv()
+load_dotenv()  # before the imports below read their settings
 
-from flask import Flask
+import os
+
+import click
+from flask import Flask, jsonify
 from flask_cors import CORS
-from db import init_db, close_db
+from werkzeug.middleware.proxy_fix import ProxyFix
+from db import init_db, close_db, stamp_write, warm_pool, DATABASE_URL, READ_AFTER_HEADER, PoolTimeout
+from migrate import migrate
 from posts import posts_bp
 from users import users_bp
-from tags import tags_bp   
+from tags import tags_bp
 from auth import AuthError
 from recent import recent_bp
 from bookmarks import bookmarks_bp
+from batch import batch_bp
+from metrics import metrics_bp, init_metrics
+from profiler import profiler_bp, init_profiler
+from tag_trie import TAG_SNAPSHOT_PATH, ensure_tag_trie, rebuild_tag_trie_from_db, reconcile_orphan_tags
+from tag_snapshot import read_version
+from coherence import start_listener
+import auth
+
+# Proxies in front of the app that append to X-Forwarded-For (e.g. 1 for
+# nginx -> gunicorn). 0 trusts none and uses the socket address, which is
+# only right when clients connect directly; behind a proxy every client
+# would share one per-IP rate limit.
+TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", "0"))
+
+
+def create_app():
+    app = Flask(__name__)
+    if TRUSTED_PROXIES > 0:
+        # request.remote_addr becomes the client's address
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
+    CORS(
+        app,
+        resources={r"/api/*": {"origins": ["http://localhost:3000"]}},
+        supports_credentials=False,
+    )
+
+    @app.after_request
+    def add_cors_headers(resp):
+        resp.headers["Access-Control-Allow-Origin"] = "http://localhost:3000"
+        resp.headers["Access-Control-Allow-Headers"] = f"Authorization, Content-Type, {READ_AFTER_HEADER}"
+        resp.headers["Access-Control-Expose-Headers"] = READ_AFTER_HEADER
+        resp.headers["Access-Control-Allow-Methods"] = "GET,POST,PUT,PATCH,DELETE,OPTIONS"
+        resp.headers["Timing-Allow-Origin"] = "http://localhost:3000"
+        return resp
+
+    @app.errorhandler(AuthError)
+    def handle_auth_error(e):
+        return e.error, e.status_code
+
+    @app.errorhandler(PoolTimeout)
+    def handle_pool_timeout(e):
+        return jsonify({"error": "Server busy, try again shortly"}), 503, {"Retry-After": "1"}
+
+    app.register_blueprint(users_bp, url_prefix="/api")
+    app.register_blueprint(posts_bp, url_prefix="/api")
+    app.register_blueprint(tags_bp,  url_prefix="/api")
+    app.register_blueprint(recent_bp, url_prefix="/api")
+    app.register_blueprint(bookmarks_bp, url_prefix="/api")
+    app.register_blueprint(metrics_bp, url_prefix="/api")
+    app.register_blueprint(batch_bp, url_prefix="/api")
+    app.register_blueprint(profiler_bp, url_prefix="/api")
+    init_metrics(app)
+    init_profiler(app)
 
-app = Flask(__name__)
+    app.after_request(stamp_write)
+    app.teardown_appcontext(close_db)
 
-CORS(
-    app,
-    resources={r"/api/*": {"origins": ["http://localhost:3000"]}},
-    supports_credentials=False,
-)
+    @app.get("/api/health")
+    def health():
+        return {"ok": True}, 200
 
-@app.after_request
-def add_cors_headers(resp):
-    resp.headers["Access-Control-Allow-Origin"] = "http://localhost:3000"
-    resp.headers["Access-Control-Allow-Headers"] = "Authorization, Content-Type"
-    resp.headers["Access-Control-Allow-Methods"] = "GET,POST,PUT,PATCH,DELETE,OPTIONS"
-    return resp
+    @app.cli.command("migrate")
+    def migrate_command():
+        """Apply pending schema migrations."""
+        applied = migrate(DATABASE_URL)
+        print("Applied: " + ", ".join(applied) if applied else "Schema is up to date")
 
-@app.errorhandler(AuthError)
-def handle_auth_error(e):
-    return e.error, e.status_code
+    @app.cli.command("reconcile-tags")
+    def reconcile_tags_command():
+        """Delete tags that no post references and resync the tag trie."""
+        removed = reconcile_orphan_tags()
+        print(f"Removed {len(removed)} orphan tag(s)")
 
-app.register_blueprint(users_bp, url_prefix="/api")
-app.register_blueprint(posts_bp, url_prefix="/api")
-app.register_blueprint(tags_bp,  url_prefix="/api")
-app.register_blueprint(recent_bp, url_prefix="/api")
-app.register_blueprint(bookmarks_bp, url_prefix="/api")
+    @app.cli.command("snapshot-tags")
+    def snapshot_tags_command():
+        """Rebuild the tag trie from the DB and write its snapshot (TAG_SNAPSHOT_PATH)."""
+        if not TAG_SNAPSHOT_PATH:
+            raise click.ClickException("TAG_SNAPSHOT_PATH is not set")
+        rebuild_tag_trie_from_db(force_snapshot=True)
+        print(f"Wrote {TAG_SNAPSHOT_PATH} (tag version {read_version(TAG_SNAPSHOT_PATH)})")
 
-app.teardown_appcontext(close_db)
-init_db(app)
+    return app
 
 
+def warmup(app, listen=True):
+    """
+    Do the first-use work now, before traffic arrives: apply migrations,
+    open the DB pool, load the tag trie, import the JWT libraries and fetch
+    JWKS, and (with `listen`) start the SHARED_STATE listener. Steps already
+    done are skipped. A pre-fork master that serves no requests passes
+    listen=False; each worker starts its own listener after the fork.
+    """
+    with app.app_context():
+        init_db(app)
+        warm_pool()
+        ensure_tag_trie()
+    auth.warmup()
+    if listen:
+        start_listener()  # no-op unless SHARED_STATE=1
 
-@app.get("/api/health")
-def health():
-    return {"ok": True}, 200
 
 if __name__ == "__main__":
+    app = create_app()
+    warmup(app)
     app.run(port=5000, debug=True)
@@ -0,0 +1,113 @@
+# backend/asgi.py
+"""
+Async serving mode:
+
+    uvicorn asgi:application --port 5000
+
+The event loop owns every client socket, so slow clients cost a coroutine
+instead of a thread. Request bodies are read in full on the loop before a
+view runs, and the Flask views (which use blocking psycopg2) execute on a
+small thread pool sized to the DB connection pool, so a thread is only
+busy while a view is actually running.
+
+JWKS is fetched asynchronously at startup and refreshed in the background,
+so auth never blocks a request thread on Auth0. The rest of app.warmup()
+(schema, DB pool, tag trie) runs during lifespan startup too, before the
+first request is accepted.
+"""
+import asyncio
+import logging
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from app import create_app, warmup
+from auth import fetch_jwks_async
+from db import DB_POOL_MAX
+
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", str(DB_POOL_MAX)))
+JWKS_REFRESH_SECONDS = int(os.getenv("JWKS_REFRESH_SECONDS", "3600"))
+
+log = logging.getLogger(__name__)
+
+
+async def _read_body(receive):
+    """Buffer the whole request body on the event loop."""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def _replay(body, receive):
+    """A receive() that hands the buffered body over once, then defers to the client."""
+    sent = False
+
+    async def replay():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay
+
+
+async def _refresh_jwks():
+    while True:
+        await asyncio.sleep(JWKS_REFRESH_SECONDS)
+        try:
+            await fetch_jwks_async()
+        except Exception:
+            log.exception("JWKS refresh failed; keeping cached keys")
+
+
+class AsgiApp:
+    def __init__(self, wsgi_app, threads):
+        self.app = wsgi_app
+        self.wsgi = WSGIMiddleware(wsgi_app, workers=threads)
+        self._refresher = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+
+        if scope["type"] == "http":
+            body = await _read_body(receive)
+            if body is None:
+                # client went away before sending the whole body
+                return
+            receive = _replay(body, receive)
+
+        await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await fetch_jwks_async()
+                except Exception:
+                    # requests fall back to the blocking fetch in auth._get_jwks
+                    log.exception("JWKS prefetch failed")
+                try:
+                    await asyncio.to_thread(warmup, self.app)
+                except Exception as e:
+                    log.exception("Warmup failed")
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                self._refresher = asyncio.create_task(_refresh_jwks())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._refresher is not None:
+                    self._refresher.cancel()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+application = AsgiApp(create_app(), ASGI_THREADS)
@@ -1,15 +1,21 @@
 # backend/auth.py
-import os, requests
+import logging
+import os
 from functools import wraps
 from typing import Any, Dict
 from flask import request, g
-from jose import jwt
+
+# jose (with cryptography) and requests take ~100 ms to import together, so
+# they are imported on first use, or ahead of time by warmup()
 
 AUTH0_DOMAIN = os.getenv("AUTH0_DOMAIN")         
 API_AUDIENCE = os.getenv("AUTH0_AUDIENCE")        
 ALGORITHMS   = os.getenv("ALGORITHMS", "RS256").split(",")
 
-JWKS_URL = f"https://{AUTH0_DOMAIN}/.well-known/jwks.json" if AUTH0_DOMAIN else None
+# AUTH0_JWKS_URL overrides where keys come from (e.g. loadtest/auth_stub.py)
+JWKS_URL = os.getenv("AUTH0_JWKS_URL") or (
+    f"https://{AUTH0_DOMAIN}/.well-known/jwks.json" if AUTH0_DOMAIN else None
+)
 ISSUER   = f"https://{AUTH0_DOMAIN}/" if AUTH0_DOMAIN else None
 HANDLE_CLAIM = "https://uic.wiki/handle"
 
@@ -25,10 +31,35 @@ def _get_jwks():
     if _jwks_cache is None:
         if not JWKS_URL:
             raise AuthError({"code":"config_error","description":"AUTH0_DOMAIN not set"}, 500)
+        import requests
         r = requests.get(JWKS_URL, timeout=5); r.raise_for_status()
         _jwks_cache = r.json()
     return _jwks_cache
 
+async def fetch_jwks_async():
+    """
+    Non-blocking JWKS fetch for the ASGI server (asgi.py). It fills the same
+    cache _get_jwks() reads, so request threads never wait on Auth0.
+    """
+    global _jwks_cache
+    if not JWKS_URL:
+        return None
+    import httpx  # only needed in ASGI mode
+    async with httpx.AsyncClient(timeout=5) as client:
+        r = await client.get(JWKS_URL); r.raise_for_status()
+    _jwks_cache = r.json()
+    return _jwks_cache
+
+def warmup():
+    """Import the JWT libraries and fetch JWKS now rather than on the first login."""
+    import jose.jwt  # noqa: F401
+    if JWKS_URL and _jwks_cache is None:
+        try:
+            _get_jwks()
+        except Exception:
+            # not fatal: the first authenticated request tries again
+            logging.getLogger(__name__).exception("JWKS prefetch failed")
+
 def _get_token() -> str:
     auth = request.headers.get("Authorization", "")
     parts = auth.split()
@@ -38,23 +69,47 @@ def _get_token() -> str:
     return parts[1]
 
 def _verify(token: str) -> Dict[str, Any]:
+    from jose import jwt, JWTError
     if not (AUTH0_DOMAIN and API_AUDIENCE):
         raise AuthError({"code":"config_error","description":"AUTH0 env vars not set"}, 500)
-    unverified = jwt.get_unverified_header(token)
+    try:
+        unverified = jwt.get_unverified_header(token)
+    except JWTError:
+        raise AuthError({"code":"invalid_token","description":"Malformed token"}, 401)
     jwks = _get_jwks()["keys"]
     rsa_key = next(({
         "kty": k["kty"], "kid": k["kid"], "use": k.get("use"),
         "n": k.get("n"), "e": k.get("e")
-    } for k in jwks if k["kid"] == unverified["kid"]), None)
+    } for k in jwks if k["kid"] == unverified.get("kid")), None)
     if rsa_key is None:
         raise AuthError({"code":"invalid_header","description":"Appropriate key not found"}, 401)
-    return jwt.decode(token, rsa_key, algorithms=ALGORITHMS, audience=API_AUDIENCE, issuer=ISSUER)
+    try:
+        return jwt.decode(token, rsa_key, algorithms=ALGORITHMS, audience=API_AUDIENCE, issuer=ISSUER)
+    except JWTError as e:
+        # expired, wrong audience/issuer, bad signature
+        raise AuthError({"code":"invalid_token","description":str(e)}, 401)
+
+def _authenticate():
+    token = _get_token()
+    # calls batched by /api/batch share g, so verify each token once
+    if g.get("_verified_token") != token:
+        g.current_user = _verify(token)
+        g._verified_token = token
 
 def requires_auth(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
-        token = _get_token()
-        g.current_user = _verify(token)
+        _authenticate()
+        return f(*args, **kwargs)
+    return wrapper
+
+def optional_auth(f):
+    """Like requires_auth, but anonymous requests go through with current_user() None.
+    A token that is sent must still be valid."""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if request.headers.get("Authorization"):
+            _authenticate()
         return f(*args, **kwargs)
     return wrapper
 
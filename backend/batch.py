@@ -0,0 +1,115 @@
+# backend/batch.py
+"""
+POST /api/batch — run several API calls in one HTTP request.
+
+    POST /api/batch
+    Authorization: Bearer <token>          (optional; shared by every call)
+    {
+      "requests": [
+        {"id": "posts", "method": "GET",  "path": "/api/posts?tag=CS"},
+        {"id": "seen",  "method": "POST", "path": "/api/recent-topics",
+         "body": {"user": "auth0|abc", "tag": "CS"}},
+        {"id": "marks", "method": "GET",  "path": "/api/bookmarks"}
+      ]
+    }
+
+    → 200 {"responses": [{"id": "posts", "status": 200, "body": [...]}, ...]}
+
+Calls run in order, inside this request's app context, so they share one
+DB connection, one token verification (requires_auth) and one user
+upsert (auto_register_user). Each call gets its own status: one failing
+does not stop the rest, and any work it left uncommitted is rolled back
+before the next call runs.
+"""
+import json
+import logging
+import os
+
+from flask import Blueprint, current_app, g, jsonify, request
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+
+from db import READ_AFTER_HEADER
+
+batch_bp = Blueprint("batch", __name__)
+
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "10"))
+_METHODS = {"GET", "POST", "DELETE"}
+
+log = logging.getLogger(__name__)
+
+
+def _sub_environ(method, path, body):
+    headers = {}
+    for name in ("Authorization", READ_AFTER_HEADER):
+        if name in request.headers:
+            headers[name] = request.headers[name]
+    return EnvironBuilder(
+        path=path,
+        method=method,
+        headers=headers,
+        json=body,
+        base_url=request.host_url,
+        environ_overrides={"REMOTE_ADDR": request.remote_addr},
+    ).get_environ()
+
+
+def _run_one(app, method, path, body):
+    """Dispatch one call; returns (status, decoded body)."""
+    with app.request_context(_sub_environ(method, path, body)):
+        try:
+            # dispatch_request, not full_dispatch_request: the before/after
+            # hooks (metrics, CORS) already run once for the batch itself
+            rv = app.dispatch_request()
+        except HTTPException as e:
+            # e.g. an unknown path: a JSON error rather than an HTML page
+            rv = jsonify({"error": e.description}), e.code
+        except Exception as e:
+            rv = app.handle_user_exception(e)
+        resp = app.make_response(rv)
+
+    data = resp.get_data(as_text=True)
+    if resp.is_json:
+        data = json.loads(data) if data else None
+    return resp.status_code, data
+
+
+def _rollback_leftovers():
+    db = g.get("db")
+    if db is not None:
+        db.rollback()
+
+
+@batch_bp.post("/batch")
+def batch():
+    body = request.get_json(silent=True) or {}
+    calls = body.get("requests")
+    if not isinstance(calls, list) or not calls:
+        return jsonify({"error": "requests must be a non-empty list"}), 400
+    if len(calls) > BATCH_MAX_REQUESTS:
+        return jsonify({"error": f"at most {BATCH_MAX_REQUESTS} requests per batch"}), 400
+
+    app = current_app._get_current_object()
+    responses = []
+    for i, call in enumerate(calls):
+        call = call if isinstance(call, dict) else {}
+        call_id = call.get("id", i)
+        method = str(call.get("method") or "GET").upper()
+        path = call.get("path") or ""
+
+        if method not in _METHODS:
+            responses.append({"id": call_id, "status": 405, "body": {"error": "Method not allowed"}})
+            continue
+        if not path.startswith("/api/") or path.split("?")[0].rstrip("/") == "/api/batch":
+            responses.append({"id": call_id, "status": 400, "body": {"error": "Invalid path"}})
+            continue
+
+        try:
+            status, data = _run_one(app, method, path, call.get("body"))
+        except Exception:
+            log.exception("batch call %s %s failed", method, path)
+            status, data = 500, {"error": "Internal server error"}
+        _rollback_leftovers()
+        responses.append({"id": call_id, "status": status, "body": data})
+
+    return jsonify({"responses": responses}), 200
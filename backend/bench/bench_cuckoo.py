@@ -0,0 +1,84 @@
+# backend/bench/bench_cuckoo.py
+"""
+CuckooHashMap and BucketCuckooHashMap vs dict: insert, lookup (hit/miss),
+delete, rehash, memory, plus the bucket map's probe/displacement stats.
+"""
+from cuckoo_map import BucketCuckooHashMap, CuckooHashMap
+
+from bench.harness import measure_memory, time_op
+
+SIZES = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+QUICK_SIZES = (10, 1_000, 10_000)
+
+
+def _keys(n):
+    return [f"CS/CS{i}/Topic" for i in range(n)]
+
+
+def _filled(cls, keys):
+    m = cls()
+    for i, k in enumerate(keys):
+        m[k] = i
+    return m
+
+
+def run(quick=False):
+    results = []
+    for n in QUICK_SIZES if quick else SIZES:
+        keys = _keys(n)
+        misses = [k + "/missing" for k in keys]
+        repeat = 3 if n >= 100_000 else 5
+
+        for label, cls in (("cuckoo", CuckooHashMap), ("bucket", BucketCuckooHashMap), ("dict", dict)):
+            def insert(_, cls=cls):
+                m = cls()
+                for i, k in enumerate(keys):
+                    m[k] = i
+
+            def lookup_hit(m):
+                for k in keys:
+                    m[k]
+
+            def lookup_miss(m):
+                for k in misses:
+                    k in m
+
+            def delete(m):
+                for k in keys:
+                    del m[k]
+
+            filled = lambda cls=cls: _filled(cls, keys)
+            results.append(time_op(f"{label}/insert/n={n}", lambda: None, insert, n, repeat))
+            results.append(time_op(f"{label}/lookup_hit/n={n}", filled, lookup_hit, n, repeat))
+            results.append(time_op(f"{label}/lookup_miss/n={n}", filled, lookup_miss, n, repeat))
+            results.append(time_op(f"{label}/delete/n={n}", filled, delete, n, repeat))
+            results.append(measure_memory(f"{label}/memory/n={n}", filled))
+
+        # cost of one doubling rehash at this size (per live entry)
+        results.append(time_op(
+            f"cuckoo/rehash/n={n}",
+            lambda: _filled(CuckooHashMap, keys),
+            lambda m: m._rehash(m._capacity * 2),
+            n, repeat,
+        ))
+        results.append(time_op(
+            f"bucket/rehash/n={n}",
+            lambda: _filled(BucketCuckooHashMap, keys),
+            lambda m: m._resize(m._n_buckets * 2),
+            n, repeat,
+        ))
+
+        # shape after building: load factor, probes per lookup, chain length
+        m = _filled(BucketCuckooHashMap, keys)
+        for k in keys:
+            m[k]
+        st = m.stats()
+        results.append({
+            "name": f"bucket/stats/n={n}",
+            "load_factor": st["load_factor"],
+            "avg_probes": st["avg_probes"],
+            "max_chain": st["max_chain"],
+            "grows": st["grows"],
+            "stash": st["stash"],
+        })
+    return results
@@ -0,0 +1,52 @@
+# backend/bench/bench_recents.py
+"""
+Per-user recents: put (steady state at _RECENT_MAX, so every put trims)
+and list, against an OrderedDict move_to_end/popitem baseline.
+"""
+from collections import OrderedDict
+
+from recent import _PerUserRecents, _RECENT_MAX
+
+from bench.harness import measure_memory, time_op
+
+OPS = 10_000
+TOPICS = [f"CS/CS{100 + i}" for i in range(40)]
+
+
+class _OrderedRecents:
+    def __init__(self):
+        self.map = OrderedDict()
+
+    def put(self, tag):
+        self.map[tag] = None
+        self.map.move_to_end(tag)
+        while len(self.map) > _RECENT_MAX:
+            self.map.popitem(last=False)
+
+    def list(self):
+        return list(reversed(self.map))
+
+
+def _warm(cls):
+    r = cls()
+    for t in TOPICS[:_RECENT_MAX]:
+        r.put(t)
+    return r
+
+
+def run(quick=False):
+    results = []
+    for label, cls in (("recents", _PerUserRecents), ("ordereddict", _OrderedRecents)):
+        def put(r):
+            for i in range(OPS):
+                r.put(TOPICS[i % len(TOPICS)])
+
+        def list_(r):
+            for _ in range(OPS):
+                r.list()
+
+        warm = lambda cls=cls: _warm(cls)
+        results.append(time_op(f"{label}/put", warm, put, OPS))
+        results.append(time_op(f"{label}/list", warm, list_, OPS))
+        results.append(measure_memory(f"{label}/memory/1000_users", lambda cls=cls: [_warm(cls) for _ in range(1000)]))
+    return results
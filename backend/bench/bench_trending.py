@@ -0,0 +1,46 @@
+# backend/bench/bench_trending.py
+"""
+Trending sketch (Space-Saving, 256 counters) on a Zipf-like stream of
+topic visits over 5000 tags, against an exact Counter. Also reports how
+many of the true top 10 the sketch ranks in its top 10.
+"""
+import random
+from collections import Counter
+
+from trending import SpaceSaving
+
+from bench.harness import measure_memory, time_op
+
+TAGS = [f"D{i % 40}/D{i % 40}{100 + i}" for i in range(5000)]
+WEIGHTS = [1 / (i + 1) ** 1.1 for i in range(len(TAGS))]
+
+
+def _stream(n):
+    return random.Random(7).choices(TAGS, weights=WEIGHTS, k=n)
+
+
+def run(quick=False):
+    n = 20_000 if quick else 200_000
+    stream = _stream(n)
+
+    def feed_sketch(s):
+        for tag in stream:
+            s.record(tag)
+
+    def feed_counter(c):
+        for tag in stream:
+            c[tag] += 1
+
+    sketch = SpaceSaving(capacity=256, half_life=1e9)
+    feed_sketch(sketch)
+    exact = [t for t, _ in Counter(stream).most_common(10)]
+    found = [r["tag"] for r in sketch.top(10)]
+
+    return [
+        time_op("trending/record", lambda: SpaceSaving(capacity=256, half_life=1e9), feed_sketch, n, repeat=3),
+        time_op("counter/record", Counter, feed_counter, n, repeat=3),
+        time_op("trending/top10", lambda: sketch, lambda s: [s.top(10) for _ in range(100)], 100),
+        measure_memory("trending/memory", lambda: (lambda s: (feed_sketch(s), s))(SpaceSaving(capacity=256, half_life=1e9))[1]),
+        measure_memory("counter/memory", lambda: (lambda c: (feed_counter(c), c))(Counter())[1]),
+        {"name": "trending/top10_recall", "hits": len(set(found) & set(exact)), "of": 10},
+    ]
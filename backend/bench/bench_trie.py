@@ -0,0 +1,90 @@
+# backend/bench/bench_trie.py
+"""
+TagTrie at realistic tag shapes (Dept/Course/Section/Topic, depth 1-4):
+insert, has_path, prefix enumeration, children, serialization, memory.
+Prefix enumeration is compared with a startswith scan over a flat list,
+which is what the DB LIKE expansion amounts to.
+"""
+import json
+
+from tag_trie import TagTrie
+
+from bench.harness import measure_memory, time_op
+
+
+def make_tags(depts, courses, sections, topics):
+    tags = []
+    for d in range(depts):
+        dept = f"D{d}"
+        tags.append(dept)
+        for c in range(courses):
+            course = f"{dept}/{dept}{100 + c}"
+            tags.append(course)
+            for s in range(sections):
+                section = f"{course}/S{s}"
+                tags.append(section)
+                for t in range(topics):
+                    tags.append(f"{section}/Topic{t}")
+    return tags
+
+
+SHAPES = {
+    # name: (depts, courses per dept, sections per course, topics per section)
+    "small": (5, 10, 3, 2),        # ~500 tags
+    "campus": (40, 60, 4, 3),      # ~38k tags
+}
+
+
+def _built(tags):
+    t = TagTrie()
+    for tag in tags:
+        t.insert(tag)
+    return t
+
+
+def run(quick=False):
+    results = []
+    for shape, dims in SHAPES.items():
+        if quick and shape != "small":
+            continue
+        tags = make_tags(*dims)
+        n = len(tags)
+        depts = [f"D{d}" for d in range(dims[0])]
+        courses = [f"D{d}/D{d}{100 + c}" for d in range(dims[0]) for c in range(dims[1])]
+        built = lambda: _built(tags)
+
+        def insert(t):
+            for tag in tags:
+                t.insert(tag)
+
+        def has_path(t):
+            for tag in tags:
+                t.has_path(tag)
+
+        def enumerate_courses(t):
+            for c in courses:
+                t.tags_under(c)
+
+        def scan_courses(flat):
+            for c in courses:
+                prefix = c + "/"
+                [x for x in flat if x == c or x.startswith(prefix)]
+
+        def children_depts(t):
+            for d in depts:
+                t.children(d)
+
+        results.append(time_op(f"trie/{shape}/insert/n={n}", TagTrie, insert, n))
+        results.append(time_op(f"trie/{shape}/has_path/n={n}", built, has_path, n))
+        results.append(time_op(f"trie/{shape}/tags_under_course/n={n}", built, enumerate_courses, len(courses)))
+        results.append(time_op(
+            f"list/{shape}/startswith_scan_course/n={n}", lambda: list(tags), scan_courses, len(courses),
+            repeat=3,
+        ))
+        results.append(time_op(f"trie/{shape}/children_dept/n={n}", built, children_depts, len(depts)))
+        results.append(time_op(
+            f"trie/{shape}/serialize_json/n={n}", built, lambda t: json.dumps(t.to_nested_dict()), 1,
+        ))
+        results.append(measure_memory(f"trie/{shape}/memory/n={n}", built))
+        results.append(measure_memory(f"list/{shape}/memory/n={n}", lambda: list(tags)))
+    return results
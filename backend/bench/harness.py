@@ -0,0 +1,55 @@
+# backend/bench/harness.py
+"""
+Small timing/memory helpers shared by the benchmark modules.
+
+Each benchmark is a function returning a list of results:
+
+    {"name": "cuckoo/insert/n=1000", "ns_per_op": 812.4, "stdev": 9.1}
+    {"name": "cuckoo/memory/n=1000", "bytes": 81234}
+
+Times are the median over `repeat` samples; every sample runs the whole
+operation once on fresh data built by `setup`.
+"""
+import gc
+import statistics
+import time
+import tracemalloc
+
+
+def time_op(name, setup, op, ops, repeat=5):
+    """
+    Time `op(state)` where `state = setup()`; `ops` is how many logical
+    operations one call performs (used to report ns per op).
+    """
+    samples = []
+    for _ in range(repeat):
+        state = setup()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter_ns()
+            op(state)
+            elapsed = time.perf_counter_ns() - start
+        finally:
+            gc.enable()
+        samples.append(elapsed / ops)
+    return {
+        "name": name,
+        "ns_per_op": round(statistics.median(samples), 2),
+        "stdev": round(statistics.stdev(samples), 2) if len(samples) > 1 else 0.0,
+    }
+
+
+def measure_memory(name, build):
+    """Bytes still allocated by the object `build()` returns."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        obj = build()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del obj
+    return {"name": name, "bytes": after - before}
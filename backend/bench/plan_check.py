@@ -0,0 +1,203 @@
+# backend/bench/plan_check.py
+"""
+Query-plan regression check for the hot read paths. Needs a seeded
+database (see loadtest/seed.py); run from the backend folder:
+
+    DATABASE_URL=postgresql://localhost/uicwiki_load python -m bench.plan_check
+    ... python -m bench.plan_check --analyze     # also time each query's real plan
+
+It calls the read endpoints through the Flask test client, captures the
+SQL they actually run (so a changed query is checked as it now is), and
+EXPLAINs each statement with enable_seqscan turned off, plus enable_sort
+for statements with a LIMIT. Postgres then only falls back to a Seq Scan
+(or a whole-index scan) when no index can narrow the query down, or to a
+Sort when no index returns the rows of a top-N query in order, so the
+result does not depend on how big the seeded tables are (tables of one
+page aside: those are read whole either way). Sorting the rows of an
+unlimited result (a profile's posts) is fine. Exits 1 if any statement
+needs what it should not.
+"""
+import argparse
+import os
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+# every request must reach the DB, not the in-memory caches
+os.environ.setdefault("FEED_ADMIT_HITS", "1000000000")
+os.environ.setdefault("POST_CACHE_SIZE", "0")
+
+import psycopg2  # noqa: E402
+
+_SORTS = {"Sort", "Incremental Sort"}
+_INDEX_SCANS = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+def _pick_params(conn):
+    """Realistic arguments from the seeded data: a busy prefix, a leaf tag, a handle, some IDs."""
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT split_part(tag, '/', 1) AS top, COUNT(*) FROM post_tags GROUP BY 1 ORDER BY 2 DESC LIMIT 1"
+    )
+    top = cur.fetchone()[0]
+    cur.execute("SELECT tag FROM post_tags WHERE tag LIKE %s GROUP BY tag ORDER BY COUNT(*) LIMIT 1", (top + "/%",))
+    leaf = (cur.fetchone() or [top])[0]
+    cur.execute(
+        "SELECT u.handle FROM users u JOIN posts p ON p.author_sub = u.sub "
+        "WHERE u.handle IS NOT NULL GROUP BY u.handle ORDER BY COUNT(*) DESC LIMIT 1"
+    )
+    handle = (cur.fetchone() or ["nobody"])[0]
+    cur.execute("SELECT postid FROM posts ORDER BY random() LIMIT 50")
+    ids = [r[0] for r in cur.fetchall()]
+    conn.rollback()
+    return top, leaf, handle, ids
+
+
+def _requests(top, leaf, handle, ids):
+    joined = ",".join(map(str, ids))
+    return [
+        ("feed, all posts", "/api/posts?limit=20"),
+        ("feed, busy prefix", f"/api/posts?tag={top}&limit=20"),
+        ("feed, leaf tag", f"/api/posts?tag={leaf}&limit=20"),
+        ("posts by ids", f"/api/posts/by_ids?ids={joined}"),
+        ("profile", f"/api/profile/{handle}"),
+        ("tag list", "/api/tags"),
+    ]
+
+
+def capture(paths):
+    """Run each request; return [(label, sql, params)] for every statement it executed."""
+    import db
+    from app import create_app
+
+    captured = []
+    label = None
+    original = db.PGDatabase.execute
+
+    def recording(self, query, params=None):
+        captured.append((label, query, tuple(params or ())))
+        return original(self, query, params)
+
+    db.PGDatabase.execute = recording
+    try:
+        client = create_app().test_client()
+        for label, path in paths:
+            r = client.get(path)
+            if r.status_code != 200:
+                raise SystemExit(f"{path} returned {r.status_code}: {r.get_data(as_text=True)[:200]}")
+    finally:
+        db.PGDatabase.execute = original
+    return captured
+
+
+def _walk(node, parent=None):
+    yield node, parent
+    for child in node.get("Plans", ()):
+        yield from _walk(child, node)
+
+
+def _describe(node):
+    rel = node.get("Relation Name")
+    index = node.get("Index Name")
+    return node["Node Type"] + (f" on {rel}" if rel else "") + (f" using {index}" if index else "")
+
+
+def _bad(node, parent, top_n, filtered, tiny=()):
+    kind = node["Node Type"]
+    if kind == "Seq Scan" or (top_n and kind in _SORTS):
+        return True
+    if kind in _INDEX_SCANS and "Index Cond" not in node:
+        # the whole index: with seq scans disabled this is how Postgres
+        # reads a table no index can narrow down. Fine when walking an index
+        # in order up to a LIMIT, when listing everything, or as the build
+        # side of a hash join / input of a merge join, which small seeded
+        # tables favour over index probes (a join strategy, not a missing
+        # index; the big table of a join is the probe side and is checked),
+        # or on a table of one page, which no index makes cheaper to read
+        if kind == "Bitmap Index Scan":
+            return True
+        if node.get("Relation Name") in tiny:
+            return False
+        return filtered and not top_n and (parent or {}).get("Node Type") not in ("Hash", "Merge Join")
+    return False
+
+
+def _tiny_tables(conn):
+    """Tables that fit in one page (as of the last ANALYZE)."""
+    cur = conn.cursor()
+    cur.execute("SELECT relname FROM pg_class WHERE relkind = 'r' AND relpages <= 1")
+    names = {r[0] for r in cur.fetchall()}
+    conn.rollback()
+    return names
+
+
+def check(conn, query, params, analyze=False, tiny=()):
+    """Returns (problems, plan summary, ms or None)."""
+    q = query.replace("?", "%s")
+    top_n = " LIMIT " in (" ".join(query.upper().split()) + " ")
+    cur = conn.cursor()
+    try:
+        cur.execute("SET LOCAL enable_seqscan = off")
+        if top_n:
+            cur.execute("SET LOCAL enable_sort = off")
+        cur.execute("EXPLAIN (FORMAT JSON) " + q, params)
+        plan = cur.fetchone()[0][0]["Plan"]
+    finally:
+        conn.rollback()
+
+    upper = " ".join(query.upper().split())
+    problems = [_describe(n) for n, parent in _walk(plan) if _bad(n, parent, top_n, " WHERE " in upper, tiny)]
+    summary = " > ".join(
+        _describe(n) for n, _ in _walk(plan) if "Scan" in n["Node Type"] or "Sort" in n["Node Type"]
+    )
+
+    ms = None
+    if analyze:
+        try:
+            cur.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + q, params)
+            ms = cur.fetchone()[0][0]["Execution Time"]
+        finally:
+            conn.rollback()
+    return problems, summary, ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--analyze", action="store_true", help="also run each query and report its time")
+    args = parser.parse_args()
+
+    dsn = os.getenv("DATABASE_URL")
+    if not dsn:
+        raise SystemExit("DATABASE_URL is not set (point it at a seeded database)")
+
+    import db
+    db.init_db()  # check against the current schema, indexes included
+
+    conn = psycopg2.connect(dsn)
+    paths = _requests(*_pick_params(conn))
+    tiny = _tiny_tables(conn)
+    failures = 0
+    seen = set()
+    for label, query, params in capture(paths):
+        if not query.lstrip().upper().startswith("SELECT"):
+            continue
+        key = (label, " ".join(query.split()))
+        if key in seen:
+            continue
+        seen.add(key)
+        problems, summary, ms = check(conn, query, params, analyze=args.analyze, tiny=tiny)
+        status = "FAIL" if problems else "ok"
+        timing = f"  {ms:.2f} ms" if ms is not None else ""
+        first_line = " ".join(query.split())[:70]
+        print(f"{status:<4} {label:<18} {first_line}{timing}")
+        print(f"     {summary}")
+        for p in problems:
+            print(f"     needs {p}")
+        failures += bool(problems)
+
+    print(f"\n{failures} statement(s) need a full scan or sort" if failures else "\nall plans use indexes")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
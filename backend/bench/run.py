@@ -0,0 +1,112 @@
+# backend/bench/run.py
+"""
+Benchmark suite for the in-memory data structures. Runs offline (no DB,
+no network); run from the backend folder:
+
+    python -m bench.run                      # everything, print results
+    python -m bench.run --quick              # small sizes only
+    python -m bench.run --only cuckoo trie   # pick suites
+    python -m bench.run --save local         # write bench/baselines/local.json
+    python -m bench.run --compare local      # diff against a saved baseline
+
+--compare exits non-zero if any result is slower (or bigger) than the
+baseline by more than --threshold (default 20%). Baselines are only
+comparable on the same machine and Python version; both are recorded in
+the file.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+
+from bench import bench_cuckoo, bench_recents, bench_trending, bench_trie
+
+SUITES = {
+    "cuckoo": bench_cuckoo,
+    "trie": bench_trie,
+    "recents": bench_recents,
+    "trending": bench_trending,
+}
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+
+def _value(result):
+    if "ns_per_op" in result:
+        return result["ns_per_op"]
+    return result.get("bytes")
+
+
+def _fmt(result):
+    if "ns_per_op" in result:
+        return f"{result['ns_per_op']:>12.1f} ns/op  (±{result['stdev']:.1f})"
+    if "bytes" in result:
+        return f"{result['bytes']:>12,d} bytes"
+    # informational results (e.g. table stats) are printed, never compared
+    return "  ".join(f"{k}={v}" for k, v in result.items() if k != "name")
+
+
+def compare(results, baseline, threshold):
+    old = {r["name"]: r for r in baseline["results"]}
+    regressions = 0
+    for r in results:
+        base = old.get(r["name"])
+        if base is None or not _value(base) or _value(r) is None:
+            print(f"{r['name']:<48} {_fmt(r)}  (new)")
+            continue
+        ratio = _value(r) / _value(base)
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{r['name']:<48} {_fmt(r)}  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--only", nargs="+", choices=sorted(SUITES))
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--save", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--threshold", type=float, default=0.20)
+    args = parser.parse_args()
+
+    results = []
+    for name in args.only or SUITES:
+        print(f"running {name} ...", file=sys.stderr)
+        results.extend(SUITES[name].run(quick=args.quick))
+
+    regressions = 0
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json"), encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+    else:
+        for r in results:
+            print(f"{r['name']:<48} {_fmt(r)}")
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(os.path.join(BASELINE_DIR, f"{args.save}.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "platform": platform.platform(),
+                    "quick": args.quick,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+            f.write("\n")
+
+    if regressions:
+        print(f"{regressions} regression(s) over {args.threshold:.0%}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
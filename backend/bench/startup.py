@@ -0,0 +1,92 @@
+# backend/bench/startup.py
+"""
+Cold-start benchmark: how long a fresh process takes to import the app,
+build it, warm it up and answer its first requests. Every sample is a new
+interpreter, so nothing is cached between runs. From the backend folder:
+
+    python -m bench.startup                 # import + create_app only, no DB needed
+    DATABASE_URL=... python -m bench.startup --runs 10
+
+With DATABASE_URL set it also times warmup() and compares the first
+/api/tags request of a warmed-up app against a cold one (schema check,
+pool connect and query all on that request).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# runs in the child; prints one JSON object of timings in ms
+_CHILD = r"""
+import json, os, sys, time
+ms = lambda t: round((time.perf_counter() - t) * 1000, 2)
+out = {}
+t = time.perf_counter(); import app; out["import app"] = ms(t)
+t = time.perf_counter(); a = app.create_app(); out["create_app()"] = ms(t)
+c = a.test_client()
+t = time.perf_counter(); c.get("/api/health"); out["first /api/health"] = ms(t)
+out["jose imported"] = "jose" in sys.modules
+if os.getenv("DATABASE_URL"):
+    if os.getenv("WARM") == "1":
+        t = time.perf_counter(); app.warmup(a); out["warmup()"] = ms(t)
+        key = "first /api/tags (warm)"
+    else:
+        key = "first /api/tags (cold)"
+    t = time.perf_counter(); r = c.get("/api/tags"); out[key] = ms(t)
+    assert r.status_code == 200, r.status_code
+    t = time.perf_counter(); c.get("/api/tags"); out["second /api/tags"] = ms(t)
+print(json.dumps(out))
+"""
+
+# what importing the app used to pull in eagerly, for comparison
+_DEFERRED = r"""
+import json, time
+t = time.perf_counter(); import jose.jwt, requests
+print(json.dumps({"import jose + requests (deferred)": round((time.perf_counter() - t) * 1000, 2)}))
+"""
+
+
+def _sample(code, env):
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def _collect(code, env, runs):
+    samples = {}
+    for _ in range(runs):
+        for name, v in _sample(code, env).items():
+            samples.setdefault(name, []).append(v)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    samples = {}
+    if env.get("DATABASE_URL"):
+        samples.update(_collect(_CHILD, dict(env, WARM="0"), args.runs))
+        samples.update(_collect(_CHILD, dict(env, WARM="1"), args.runs))
+    else:
+        print("DATABASE_URL not set: timing import and create_app only", file=sys.stderr)
+        samples.update(_collect(_CHILD, env, args.runs))
+    samples.update(_collect(_DEFERRED, env, args.runs))
+
+    for name, values in samples.items():
+        if isinstance(values[0], bool):
+            print(f"{name:<40} {values[0]}")
+            continue
+        spread = statistics.stdev(values) if len(values) > 1 else 0.0
+        print(f"{name:<40} {statistics.median(values):>9.1f} ms  (±{spread:.1f})")
+
+
+if __name__ == "__main__":
+    main()
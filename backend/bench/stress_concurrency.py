@@ -0,0 +1,170 @@
+# backend/bench/stress_concurrency.py
+"""
+Concurrency stress test for the structures shared between request threads:
+
+    cd backend
+    python -m bench.stress_concurrency            # exits 1 on any failure
+    python -m bench.stress_concurrency --show-unsafe
+
+  - ConcurrentCuckooHashMap: writer threads insert/overwrite/delete
+    disjoint key ranges (forcing displacements and rehashes) while reader
+    threads look up keys inserted up front, which must never go missing.
+  - recents: many threads hitting one cold user hydrate it exactly once.
+
+The thread switch interval is cranked down so threads interleave inside
+the displacement loop rather than between whole operations.
+
+--show-unsafe runs the map test against the plain CuckooHashMap too, to
+show it does lose keys under the same load.
+"""
+import argparse
+import sys
+import threading
+import time
+
+from cuckoo_map import ConcurrentCuckooHashMap, CuckooHashMap
+
+WRITERS = 8
+READERS = 4
+KEYS_PER_WRITER = 2_000
+STABLE_KEYS = 500
+
+
+def _lookup(m, key):
+    # plain CuckooHashMap has no get()
+    try:
+        return m[key]
+    except KeyError:
+        return None
+
+
+def stress_map(cls, writers=WRITERS, readers=READERS, keys_per_writer=KEYS_PER_WRITER):
+    """Return a list of error strings (empty when the map behaved)."""
+    m = cls(initial_capacity=8)
+    for i in range(STABLE_KEYS):
+        m[f"stable-{i}"] = i
+
+    errors = []
+    done = threading.Event()
+    start = threading.Barrier(writers + readers)
+
+    def record(msg):
+        if len(errors) < 20:
+            errors.append(msg)
+
+    def writer(w):
+        start.wait()
+        try:
+            keys = [f"w{w}-{i}" for i in range(keys_per_writer)]
+            for i, k in enumerate(keys):
+                m[k] = i
+            for i, k in enumerate(keys):
+                m[k] = i * 2  # overwrite in place
+            for k in keys[::2]:
+                del m[k]
+            for i, k in enumerate(keys):
+                expected = None if i % 2 == 0 else i * 2
+                got = _lookup(m, k)
+                if got != expected:
+                    record(f"{k}: expected {expected!r}, got {got!r}")
+        except Exception as e:
+            record(f"writer {w} raised {type(e).__name__}: {e}")
+
+    def reader():
+        start.wait()
+        try:
+            while not done.is_set():
+                for i in range(0, STABLE_KEYS, 7):
+                    got = _lookup(m, f"stable-{i}")
+                    if got != i:
+                        record(f"stable-{i}: expected {i}, got {got!r}")
+        except Exception as e:
+            record(f"reader raised {type(e).__name__}: {e}")
+
+    wthreads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+    rthreads = [threading.Thread(target=reader) for _ in range(readers)]
+    for t in wthreads + rthreads:
+        t.start()
+    for t in wthreads:
+        t.join()
+    done.set()
+    for t in rthreads:
+        t.join()
+
+    expected_len = STABLE_KEYS + writers * (keys_per_writer // 2)
+    if len(m) != expected_len:
+        record(f"len: expected {expected_len}, got {len(m)}")
+    return errors
+
+
+def stress_recents_single_flight(threads=32):
+    """Many threads miss on the same cold user; only one may hydrate it."""
+    import recent
+
+    calls = []
+    original = recent._hydrate_from_db
+
+    def slow_hydrate(user_key, bucket):
+        calls.append(user_key)
+        time.sleep(0.05)  # hold the window open so the others pile up
+        recent._seed(bucket, ["CS/CS141", "CS/CS151"])
+
+    recent._hydrate_from_db = slow_hydrate
+    errors = []
+    try:
+        recent._USERS.pop("stress-user", None)
+        start = threading.Barrier(threads)
+        seen = []
+
+        def hit():
+            start.wait()
+            seen.append(recent._get_bucket("stress-user").list())
+
+        ts = [threading.Thread(target=hit) for _ in range(threads)]
+        for t in ts:
+            t.start()
+        for t in ts:
+            t.join()
+
+        if len(calls) != 1:
+            errors.append(f"hydrated {len(calls)} times, expected 1")
+        if any(s != seen[0] for s in seen) or len(seen[0]) != 2:
+            errors.append(f"threads saw different recents: {seen[:3]}...")
+    finally:
+        recent._hydrate_from_db = original
+        recent._USERS.pop("stress-user", None)
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--show-unsafe", action="store_true", help="also run the map test on plain CuckooHashMap")
+    args = parser.parse_args(argv)
+
+    sys.setswitchinterval(1e-6)
+    failed = False
+
+    checks = [
+        ("ConcurrentCuckooHashMap", lambda: stress_map(ConcurrentCuckooHashMap)),
+        ("recents single-flight", stress_recents_single_flight),
+    ]
+    for label, check in checks:
+        t0 = time.perf_counter()
+        errors = check()
+        status = "FAIL" if errors else "ok"
+        print(f"{label:<28} {status}  ({time.perf_counter() - t0:.1f}s)")
+        for e in errors:
+            print(f"    {e}")
+        failed = failed or bool(errors)
+
+    if args.show_unsafe:
+        errors = stress_map(CuckooHashMap)
+        print(f"{'CuckooHashMap (unsafe)':<28} {len(errors)} errors (expected > 0)")
+        for e in errors[:5]:
+            print(f"    {e}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+# backend/bookmark_set.py
+"""
+Per-user bookmark membership, for the `is_bookmarked` flag on posts.
+
+The users.bookmarks column is a JSON list, so answering "has this user
+bookmarked post N?" for a whole feed would mean loading and parsing it
+on every request. Instead each user's bookmarks are kept as a sorted
+array of postIDs (8 bytes per bookmark, no per-item objects) and looked
+up with binary search:
+
+    marks = bookmarks_for(sub)     # loaded once, then cached
+    42 in marks                    # O(log n)
+
+add/remove update the cached set in place after the bookmark endpoints
+commit. Other workers drop the user's set on a "bookmarks" notification.
+Sets are read with get_read_db(), on the same connection as the feed
+that is being flagged; a set read from a replica is not cached within
+REPLICA_MAX_LAG of a bookmark change, as it may predate the change.
+At most BOOKMARK_SET_USERS users are cached (least recently used
+dropped first).
+"""
+import json
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from coherence import on_resync, subscribe
+from db import REPLICA_MAX_LAG, get_read_db
+
+BOOKMARK_SET_USERS = int(os.getenv("BOOKMARK_SET_USERS", "10000"))
+
+
+class SortedIntSet:
+    """Immutable set of ints stored as a sorted array('q')."""
+
+    __slots__ = ("_items",)
+
+    def __init__(self, ids=()):
+        self._items = array("q", sorted(set(ids)))
+
+    def __contains__(self, post_id):
+        items = self._items
+        i = bisect_left(items, post_id)
+        return i < len(items) and items[i] == post_id
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def with_id(self, post_id):
+        """Copy with `post_id` added (copy-on-write, so readers never see a half update)."""
+        if post_id in self:
+            return self
+        out = SortedIntSet()
+        items = self._items
+        i = bisect_left(items, post_id)
+        out._items = items[:i] + array("q", [post_id]) + items[i:]
+        return out
+
+    def without_id(self, post_id):
+        """Copy with `post_id` removed."""
+        if post_id not in self:
+            return self
+        out = SortedIntSet()
+        items = self._items
+        i = bisect_left(items, post_id)
+        out._items = items[:i] + items[i + 1:]
+        return out
+
+
+_lock = threading.Lock()
+_sets = OrderedDict()   # sub -> SortedIntSet, least recently used first
+_generation = 0         # bumped by every change, see bookmarks_for()
+_changed_at = {}        # sub -> monotonic time of that user's last change
+_all_changed_at = 0.0   # last invalidate() of every user
+
+
+def bookmarks_for(sub) -> SortedIntSet:
+    """The user's bookmarked postIDs, from the cache or one users-row read."""
+    with _lock:
+        marks = _sets.get(sub)
+        if marks is not None:
+            _sets.move_to_end(sub)
+            return marks
+        generation = _generation
+
+    db = get_read_db()
+    row = db.execute("SELECT bookmarks FROM users WHERE sub = ?", (sub,)).fetchone()
+    marks = SortedIntSet(json.loads(row["bookmarks"] or "[]") if row else [])
+    with _lock:
+        if generation != _generation:
+            # a bookmark changed while we read; the row may predate it
+            return marks
+        changed = max(_changed_at.get(sub, 0.0), _all_changed_at)
+        if db.replica and time.monotonic() - changed < REPLICA_MAX_LAG:
+            return marks
+        _sets[sub] = marks
+        while len(_sets) > BOOKMARK_SET_USERS:
+            _sets.popitem(last=False)
+    return marks
+
+
+def _note_change(sub):
+    """Record that `sub`'s bookmarks changed (caller holds _lock)."""
+    now = time.monotonic()
+    _changed_at[sub] = now
+    if len(_changed_at) > BOOKMARK_SET_USERS:
+        # only the last REPLICA_MAX_LAG seconds matter
+        for k, t in list(_changed_at.items()):
+            if now - t >= REPLICA_MAX_LAG:
+                del _changed_at[k]
+
+
+def bookmark_added(sub, post_id):
+    global _generation
+    with _lock:
+        _generation += 1
+        _note_change(sub)
+        marks = _sets.get(sub)
+        if marks is not None:
+            _sets[sub] = marks.with_id(post_id)
+
+
+def bookmark_removed(sub, post_id):
+    global _generation
+    with _lock:
+        _generation += 1
+        _note_change(sub)
+        marks = _sets.get(sub)
+        if marks is not None:
+            _sets[sub] = marks.without_id(post_id)
+
+
+def invalidate(sub=None):
+    """Forget one user's set, or every set when `sub` is None."""
+    global _generation, _all_changed_at
+    with _lock:
+        _generation += 1
+        if sub is None:
+            _all_changed_at = time.monotonic()
+            _sets.clear()
+        else:
+            _note_change(sub)
+            _sets.pop(sub, None)
+
+
+def flag_bookmarked(posts, sub):
+    """
+    Copies of `posts` with "is_bookmarked" set for `sub`. Copies, because
+    the post dicts may be shared with feed_cache/post_cache.
+    """
+    marks = bookmarks_for(sub)
+    return [{**p, "is_bookmarked": p["postID"] in marks} for p in posts]
+
+
+# another worker changed someone's bookmarks
+subscribe("bookmarks", lambda payload: invalidate(payload.get("sub")) if payload.get("sub") else None)
+on_resync(invalidate)
@@ -2,7 +2,10 @@ import json
 from flask import Blueprint, jsonify
 from db import get_db
 from auth import requires_auth
+from admission import rate_limit
 from users import auto_register_user
+from coherence import publish
+import bookmark_set
 
 bookmarks_bp = Blueprint("bookmarks", __name__)
 
@@ -71,6 +74,7 @@ def list_bookmarks():
 
 @bookmarks_bp.post("/bookmarks/<int:post_id>")
 @requires_auth
+@rate_limit("bookmarks", "60/60")
 def add_bookmark(post_id):
     """
     Add a postID to the current user's bookmarks list.
@@ -94,13 +98,16 @@ def add_bookmark(post_id):
             "UPDATE users SET bookmarks = ? WHERE sub = ?",
             (json.dumps(bookmarks), sub),
         )
+        publish(db, "bookmarks", sub=sub)
         db.commit()
+        bookmark_set.bookmark_added(sub, post_id)
 
     return jsonify({"bookmarked": True, "postID": post_id}), 200
 
 
 @bookmarks_bp.delete("/bookmarks/<int:post_id>")
 @requires_auth
+@rate_limit("bookmarks", "60/60")
 def remove_bookmark(post_id):
     """
     Remove a postID from the current user's bookmarks list.
@@ -116,6 +123,8 @@ def remove_bookmark(post_id):
             "UPDATE users SET bookmarks = ? WHERE sub = ?",
             (json.dumps(bookmarks), sub),
         )
+        publish(db, "bookmarks", sub=sub)
         db.commit()
+        bookmark_set.bookmark_removed(sub, post_id)
 
     return jsonify({"bookmarked": False, "postID": post_id}), 200
@@ -0,0 +1,164 @@
+# backend/coherence.py
+"""
+Cross-worker coherence for the in-memory structures (TAG_TRIE, recents).
+
+Each worker process keeps its own copies, so when we run more than one
+worker a change made in one of them has to be announced to the others.
+We use Postgres LISTEN/NOTIFY for that:
+
+    publish(db, "tags")                 # inside the writer's transaction
+    subscribe("tags", on_tags_changed)  # in the module that owns the cache
+
+Notifications are only delivered when the writer's transaction commits,
+so other workers never see a change that was rolled back.
+
+Enabled with SHARED_STATE=1; with a single worker nothing is sent and no
+listener thread is started.
+"""
+import json
+import logging
+import os
+import select
+import threading
+import time
+
+import psycopg2
+
+from db import DATABASE_URL
+
+SHARED_STATE = os.getenv("SHARED_STATE", "0") == "1"
+CHANNEL = "uicwiki_sync"
+
+log = logging.getLogger(__name__)
+
+_handlers = {}          # kind -> [handler(payload)]
+_resync_handlers = []   # called when we may have missed notifications
+_listen_handlers = []   # called once LISTEN is in effect, see on_listen()
+_listener_pid = None
+
+
+def _origin() -> str:
+    # pid is read at call time so forked workers get their own origin
+    return f"{os.uname().nodename}:{os.getpid()}"
+
+
+def subscribe(kind, handler):
+    """Call `handler(payload)` for every notification of `kind` from another worker."""
+    _handlers.setdefault(kind, []).append(handler)
+
+
+def on_resync(handler):
+    """
+    Call `handler()` whenever the listener loses its connection. Notifications
+    sent while we were disconnected are lost, so caches should drop everything.
+    """
+    _resync_handlers.append(handler)
+
+
+def on_listen(handler):
+    """
+    Call `handler(cur)` when the listener first starts listening, with a
+    cursor on its (autocommit) connection. Changes committed before LISTEN
+    took effect were never announced to us: in a forked worker, anything
+    since the fork; in the master, anything since its warmup. Caches built
+    before then compare themselves with the DB here.
+    """
+    _listen_handlers.append(handler)
+
+
+def publish(db, kind, **data):
+    """
+    Queue a notification on the caller's transaction. It is delivered to
+    the other workers when `db.commit()` runs.
+    """
+    if not SHARED_STATE:
+        return
+    payload = json.dumps({"kind": kind, "origin": _origin(), **data})
+    db.execute("SELECT pg_notify(?, ?)", (CHANNEL, payload))
+
+
+def _dispatch(raw):
+    try:
+        payload = json.loads(raw)
+    except json.JSONDecodeError:
+        return
+    if payload.get("origin") == _origin():
+        # our own change, already applied locally
+        return
+    for handler in _handlers.get(payload.get("kind"), []):
+        try:
+            handler(payload)
+        except Exception:
+            log.exception("coherence handler failed for %r", payload)
+
+
+def _resync():
+    for handler in _resync_handlers:
+        try:
+            handler()
+        except Exception:
+            log.exception("coherence resync handler failed")
+
+
+def _catch_up(cur):
+    for handler in _listen_handlers:
+        try:
+            handler(cur)
+        except Exception:
+            log.exception("coherence listen handler failed")
+            _resync()
+            return
+
+
+def _listen_forever():
+    backoff = 1
+    reconnecting = False
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(DATABASE_URL)
+            conn.set_session(autocommit=True)
+            cur = conn.cursor()
+            cur.execute(f"LISTEN {CHANNEL}")
+            if reconnecting:
+                # anything could have changed while we were disconnected
+                _resync()
+            else:
+                # or since our caches were built, before LISTEN took effect
+                _catch_up(cur)
+            reconnecting = True
+            backoff = 1
+
+            while True:
+                if select.select([conn], [], [], 5) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    _dispatch(conn.notifies.pop(0).payload)
+        except Exception:
+            log.exception("coherence listener lost its connection; retrying")
+            reconnecting = True
+            _resync()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+
+def start_listener():
+    """
+    Start the LISTEN thread for this process. Safe to call more than once;
+    after a fork the child starts its own thread.
+    """
+    global _listener_pid
+    if not SHARED_STATE or _listener_pid == os.getpid():
+        return
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL is not set")
+    _listener_pid = os.getpid()
+    t = threading.Thread(target=_listen_forever, name="coherence-listener", daemon=True)
+    t.start()
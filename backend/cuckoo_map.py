@@ -7,8 +7,13 @@ existing keys ("cuckoo" them) and reinsert them in the alternate table.
 If we detect too many displacements, we rehash to a bigger table.
 
 This is deliberately small and simple because our per-user recents
-never exceed 10 entries.
+never exceed 10 entries. BucketCuckooHashMap below is the variant for
+large maps: 4-slot buckets and a stash keep it over 90% full.
 """
+import random
+import threading
+import time
+
 
 class CuckooHashMap:
     def __init__(self, initial_capacity=16, max_load_factor=0.4, max_displacements=32):
@@ -144,3 +149,330 @@ class CuckooHashMap:
     def __iter__(self):
         for k, _ in self.items():
             yield k
+
+
+class BucketCuckooHashMap:
+    """
+    Bucketized cuckoo hash map: one table of buckets with `bucket_size`
+    slots each (4 by default), two candidate buckets per key, and a small
+    overflow stash.
+
+    Compared with CuckooHashMap (one slot per position, max load 0.4),
+    each key can sit in any of 8 slots, so the table stays above 90% full
+    before it has to grow. A key whose displacement chain runs too long
+    goes into the stash instead of forcing a rehash; the table only grows
+    when the stash is also full. Deleting down to `shrink_load_factor`
+    halves the table again.
+
+    `random_walk=True` evicts a random slot at each displacement step
+    instead of cycling through the slots, which avoids ping-ponging
+    between the same few keys.
+
+    stats() reports probe counts, displacement chain lengths and how often
+    the table was resized.
+    """
+
+    def __init__(self, initial_capacity=16, bucket_size=4, max_load_factor=0.95,
+                 shrink_load_factor=0.25, max_displacements=64, stash_size=4,
+                 random_walk=False, seed=None):
+        self._bucket_size = bucket_size
+        self._min_buckets = self._buckets_for(initial_capacity)
+        self._max_load = max_load_factor
+        self._shrink_load = shrink_load_factor
+        self._max_displacements = max_displacements
+        self._stash_limit = stash_size
+        self._random_walk = random_walk
+        self._rng = random.Random(seed)
+
+        self._size = 0
+        self._stash = []  # [(key, value)]
+        self._alloc(self._min_buckets)
+
+        self._stats = {
+            "lookups": 0,
+            "probes": 0,             # buckets (or stash) examined by lookups
+            "inserts": 0,
+            "displacements": 0,      # total evictions
+            "max_chain": 0,          # longest displacement chain seen
+            "stash_inserts": 0,
+            "grows": 0,
+            "shrinks": 0,
+        }
+
+    def _buckets_for(self, capacity):
+        n = 1
+        while n * self._bucket_size < capacity:
+            n <<= 1
+        return n
+
+    def _alloc(self, n_buckets):
+        self._n_buckets = n_buckets
+        self._slots = [None] * (n_buckets * self._bucket_size)
+
+    # ---- hashing helpers ----
+    def _bucket1(self, key):
+        return hash(key) & (self._n_buckets - 1)
+
+    def _bucket2(self, key):
+        h = hash(key)
+        h ^= (h >> 16)
+        return ((h * 0x5BD1E995) >> 8) & (self._n_buckets - 1)
+
+    # ---- basic API ----
+    def __len__(self):
+        return self._size
+
+    def _find(self, key):
+        """Return ("table", slot index) or ("stash", index) or None."""
+        self._stats["lookups"] += 1
+        bs = self._bucket_size
+        for b in (self._bucket1(key), self._bucket2(key)):
+            self._stats["probes"] += 1
+            base = b * bs
+            for i in range(base, base + bs):
+                e = self._slots[i]
+                if e is not None and e[0] == key:
+                    return ("table", i)
+        if self._stash:
+            self._stats["probes"] += 1
+            for i, (k, _) in enumerate(self._stash):
+                if k == key:
+                    return ("stash", i)
+        return None
+
+    def __contains__(self, key):
+        return self._find(key) is not None
+
+    def __getitem__(self, key):
+        loc = self._find(key)
+        if loc is None:
+            raise KeyError(key)
+        where, i = loc
+        return (self._slots if where == "table" else self._stash)[i][1]
+
+    def _free_slot(self, b):
+        base = b * self._bucket_size
+        for i in range(base, base + self._bucket_size):
+            if self._slots[i] is None:
+                return i
+        return None
+
+    def _place(self, key, value):
+        """
+        Put a key known to be absent into the table, evicting along a
+        displacement chain if needed. Returns the (key, value) left
+        homeless when the chain gets too long, else None.
+        """
+        k, v = key, value
+        b = self._bucket1(k)
+        for step in range(self._max_displacements + 1):
+            for cand in (b, self._bucket2(k)) if step == 0 else (b,):
+                slot = self._free_slot(cand)
+                if slot is not None:
+                    self._slots[slot] = (k, v)
+                    if step > self._stats["max_chain"]:
+                        self._stats["max_chain"] = step
+                    return None
+
+            # evict a victim from bucket b and move it to its other bucket
+            offset = (self._rng.randrange(self._bucket_size) if self._random_walk
+                      else step % self._bucket_size)
+            slot = b * self._bucket_size + offset
+            (k, v), self._slots[slot] = self._slots[slot], (k, v)
+            self._stats["displacements"] += 1
+            b1, b2 = self._bucket1(k), self._bucket2(k)
+            b = b2 if b1 == b else b1
+
+        self._stats["max_chain"] = max(self._stats["max_chain"], self._max_displacements)
+        return (k, v)
+
+    def _resize(self, n_buckets):
+        old = list(self.items())
+        self._alloc(n_buckets)
+        self._stash = []
+        self._size = 0
+        for k, v in old:
+            self._insert_new(k, v)
+
+    def _insert_new(self, key, value):
+        homeless = self._place(key, value)
+        while homeless is not None:
+            if len(self._stash) < self._stash_limit:
+                self._stash.append(homeless)
+                self._stats["stash_inserts"] += 1
+                break
+            # stash full: grow, then re-place the homeless key
+            self._stats["grows"] += 1
+            k, v = homeless
+            self._resize(self._n_buckets * 2)
+            homeless = self._place(k, v)
+        self._size += 1
+
+    def __setitem__(self, key, value):
+        loc = self._find(key)
+        if loc is not None:
+            where, i = loc
+            (self._slots if where == "table" else self._stash)[i] = (key, value)
+            return
+
+        self._stats["inserts"] += 1
+        if self._size + 1 > len(self._slots) * self._max_load:
+            self._stats["grows"] += 1
+            self._resize(self._n_buckets * 2)
+        self._insert_new(key, value)
+
+    def __delitem__(self, key):
+        loc = self._find(key)
+        if loc is None:
+            raise KeyError(key)
+        where, i = loc
+        if where == "table":
+            self._slots[i] = None
+        else:
+            self._stash.pop(i)
+        self._size -= 1
+
+        if self._stash:
+            # a freed slot may let a stashed key back into the table
+            k, v = self._stash.pop(0)
+            homeless = self._place(k, v)
+            if homeless is not None:
+                self._stash.append(homeless)
+
+        if (self._n_buckets > self._min_buckets
+                and self._size < len(self._slots) * self._shrink_load):
+            self._stats["shrinks"] += 1
+            self._resize(self._n_buckets // 2)
+
+    def items(self):
+        """Yield (key, value) pairs."""
+        for e in self._slots:
+            if e is not None:
+                yield e
+        yield from list(self._stash)
+
+    def __iter__(self):
+        for k, _ in self.items():
+            yield k
+
+    def load_factor(self):
+        return self._size / len(self._slots)
+
+    def stats(self):
+        """Counters since creation plus the current shape of the table."""
+        out = dict(self._stats)
+        out.update(
+            size=self._size,
+            slots=len(self._slots),
+            load_factor=round(self.load_factor(), 4),
+            stash=len(self._stash),
+            avg_probes=round(self._stats["probes"] / self._stats["lookups"], 3)
+            if self._stats["lookups"] else 0.0,
+        )
+        return out
+
+
+class ConcurrentCuckooHashMap(CuckooHashMap):
+    """
+    CuckooHashMap that is safe to share between threads (threaded WSGI
+    workers, see gunicorn.conf.py).
+
+    Writers serialize on one lock. A displacement chain or a rehash can
+    touch any slot, so striping locks by slot would not isolate writers.
+    Readers never take the lock: they use a sequence counter (a seqlock).
+    Writers bump the counter to an odd value before changing the tables
+    and back to even afterwards. A reader records the counter, does the
+    lookup, and retries if the counter moved or was odd, so a lookup
+    never sees a key half-way through being moved.
+    """
+
+    _READ_RETRIES = 100
+
+    def __init__(self, *args, **kwargs):
+        self._write_lock = threading.RLock()
+        self._writing = False
+        self._seq = 0
+        super().__init__(*args, **kwargs)
+
+    def _read(self, fn):
+        for _ in range(self._READ_RETRIES):
+            seq = self._seq
+            if seq & 1:
+                time.sleep(0)  # a writer is mid-update; yield to it
+                continue
+            try:
+                result = fn()
+            except (IndexError, TypeError):
+                # tables swapped under us by a rehash; retry
+                continue
+            if self._seq == seq:
+                return result
+        # heavy write contention: fall back to reading under the lock
+        with self._write_lock:
+            return fn()
+
+    def _find_value(self, key):
+        loc = self._find_slot(key)
+        if loc is None:
+            return False, None
+        t, idx = loc
+        return True, (self._table1 if t == 1 else self._table2)[idx][1]
+
+    def __contains__(self, key):
+        return self._read(lambda: self._find_slot(key) is not None)
+
+    def __getitem__(self, key):
+        found, value = self._read(lambda: self._find_value(key))
+        if not found:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        found, value = self._read(lambda: self._find_value(key))
+        return value if found else default
+
+    def __setitem__(self, key, value):
+        with self._write_lock:
+            if self._writing:
+                # re-entered from CuckooHashMap.__setitem__ after a rehash
+                CuckooHashMap.__setitem__(self, key, value)
+                return
+            # overwriting is a single slot store, which readers see atomically;
+            # only a displacement chain or rehash needs the sequence counter
+            if self._set_existing(key, value):
+                return
+            self._writing = True
+            self._seq += 1
+            try:
+                CuckooHashMap.__setitem__(self, key, value)
+            finally:
+                self._seq += 1
+                self._writing = False
+
+    def __delitem__(self, key):
+        # clears one slot; no other key moves
+        with self._write_lock:
+            CuckooHashMap.__delitem__(self, key)
+
+    def _rehash(self, new_capacity):
+        # runs inside a write, so read the tables directly rather than
+        # through the snapshotting items() below
+        old_items = self._snapshot()
+
+        self._capacity = 1
+        while self._capacity < new_capacity:
+            self._capacity <<= 1
+
+        self._table1 = [None] * self._capacity
+        self._table2 = [None] * self._capacity
+        self._size = 0
+
+        for k, v in old_items:
+            CuckooHashMap.__setitem__(self, k, v)
+
+    def _snapshot(self):
+        return [e for e in self._table1 if e is not None] + [e for e in self._table2 if e is not None]
+
+    def items(self):
+        """Snapshot of (key, value) pairs, consistent at one point in time."""
+        return iter(self._read(self._snapshot))
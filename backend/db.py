@@ -1,10 +1,36 @@
 # backend/db.py
+import logging
 import os
-from flask import g
+import re
+import threading
+import time
+from flask import g, request
 import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
+from migrate import migrate
+from metrics import record_query
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "10"))
+# Longest a request waits for a free pooled connection before giving up (503)
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "5"))
+
+# Optional read replica for get_read_db(); unset means reads use the primary
+DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL")
+# How far behind the primary the replica may be; caches don't keep rows
+# read from the replica within this long of a change
+REPLICA_MAX_LAG = float(os.environ.get("REPLICA_MAX_LAG", "5"))
+# Response header carrying the primary's WAL position (LSN) after a write;
+# the client sends it back on later requests (see get_read_db)
+READ_AFTER_HEADER = "X-Read-After"
+_LSN = re.compile(r"[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}")
+# After a replica connection fails, use the primary this long before retrying
+REPLICA_RETRY_SECONDS = float(os.environ.get("REPLICA_RETRY_SECONDS", "30"))
+
+log = logging.getLogger(__name__)
 
 
 class PGDatabase:
@@ -16,46 +42,258 @@ class PGDatabase:
         row = cur.fetchone()
     """
 
-    def __init__(self, conn):
+    def __init__(self, conn, replica=False):
         self.conn = conn
+        self.replica = replica   # True when conn comes from the replica pool
+        self.wrote = False
 
     def execute(self, query, params=None):
         # convert "?" placeholders to "%s" for psycopg2
         q = query.replace("?", "%s")
         cur = self.conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute(q, params or ())
+        start = time.perf_counter()
+        try:
+            cur.execute(q, params or ())
+        finally:
+            record_query(query, time.perf_counter() - start)
         return cur
 
     def commit(self):
         self.conn.commit()
+        self.wrote = True
+
+    def rollback(self):
+        self.conn.rollback()
 
     def close(self):
         self.conn.close()
 
 
+class PoolTimeout(Exception):
+    """No pooled connection came free within DB_POOL_TIMEOUT (app.py answers 503)."""
+
+
+class ConnectionPool:
+    """
+    psycopg2's ThreadedConnectionPool raises as soon as every connection is
+    checked out; this wrapper makes getconn() wait for one instead, so the
+    number of request threads can exceed DB_POOL_MAX. The wait is bounded
+    by `timeout`, so an exhausted (or leaked) pool sheds requests rather
+    than hanging them.
+    """
+
+    def __init__(self, dsn, minconn, maxconn, timeout=DB_POOL_TIMEOUT):
+        self._pool = ThreadedConnectionPool(minconn, maxconn, dsn)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self.timeout = timeout
+        self.pid = os.getpid()
+
+    def getconn(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"no DB connection free within {self.timeout:g}s")
+        try:
+            return self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        try:
+            if not conn.closed and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                # never hand the next request a half-finished transaction
+                conn.rollback()
+            self._pool.putconn(conn, close=bool(conn.closed))
+        except psycopg2.Error:
+            self._pool.putconn(conn, close=True)
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+
+_pools = {}   # "primary" / "replica" -> ConnectionPool
+_pool_lock = threading.Lock()
+_schema_ready = False
+_schema_lock = threading.Lock()
+_replica_down_until = 0.0
+
+
+def _get_named_pool(name, dsn):
+    pool = _pools.get(name)
+    if pool is None or pool.pid != os.getpid():
+        with _pool_lock:
+            pool = _pools.get(name)
+            if pool is None or pool.pid != os.getpid():
+                pool = _pools[name] = ConnectionPool(dsn, DB_POOL_MIN, DB_POOL_MAX)
+    return pool
+
+
+def get_pool():
+    """Return this process's connection pool, creating it on first use."""
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL is not set")
+    return _get_named_pool("primary", DATABASE_URL)
+
+
+def close_pool():
+    """Close every pooled connection (call in a parent process before forking workers)."""
+    with _pool_lock:
+        for pool in _pools.values():
+            if pool.pid == os.getpid():
+                pool.closeall()
+        _pools.clear()
+
+
 def get_db():
     if "db" not in g:
-        if not DATABASE_URL:
-            raise RuntimeError("DATABASE_URL is not set")
-        conn = psycopg2.connect(DATABASE_URL)
+        init_db()
+        conn = get_pool().getconn()
         g.db = PGDatabase(conn)
     return g.db
 
 
+def _replica_caught_up(conn) -> bool:
+    """
+    False when the client sent the READ_AFTER_HEADER stamp of a write the
+    replica behind `conn` has not replayed yet (or it is not a streaming
+    standby, so there is nothing to compare with).
+    """
+    stamp = request.headers.get(READ_AFTER_HEADER, "")
+    if not _LSN.fullmatch(stamp):
+        return True
+    cur = conn.cursor()
+    cur.execute("SELECT pg_last_wal_replay_lsn() >= %s::pg_lsn", (stamp,))
+    return bool(cur.fetchone()[0])
+
+
+def stamp_write(resp):
+    """
+    after_request hook: when this request committed, send the primary's
+    WAL position in READ_AFTER_HEADER. The client echoes it, and its reads
+    stay on the primary until the replica has replayed that far, whichever
+    worker or host serves them; no clocks are compared. A forged stamp
+    only moves that client's reads to the primary.
+    """
+    db = g.get("db")
+    if DATABASE_REPLICA_URL and db is not None and db.wrote:
+        try:
+            lsn = db.execute("SELECT pg_current_wal_lsn()::text AS lsn").fetchone()["lsn"]
+        except psycopg2.Error:
+            log.exception("could not read the WAL position for %s", READ_AFTER_HEADER)
+        else:
+            resp.headers[READ_AFTER_HEADER] = lsn
+    return resp
+
+
+def _read_session(conn, pool):
+    """Put `conn` in autocommit, read-only mode (returning it to `pool` on failure)."""
+    try:
+        if not (conn.autocommit and conn.readonly):
+            conn.set_session(readonly=True, autocommit=True)
+    except psycopg2.Error:
+        pool.putconn(conn)
+        raise
+
+
+def _replica_conn():
+    """A connection from the replica pool, or None if there is none or it is down."""
+    global _replica_down_until
+    if not DATABASE_REPLICA_URL or time.monotonic() < _replica_down_until:
+        return None
+    try:
+        return _get_named_pool("replica", DATABASE_REPLICA_URL).getconn()
+    except PoolTimeout:
+        return None   # busy, not down: this read uses the primary
+    except psycopg2.Error as e:
+        _replica_down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+        log.warning("Replica unavailable, reading from the primary for %ss: %s", REPLICA_RETRY_SECONDS, e)
+        return None
+
+
+def get_read_db():
+    """
+    Connection for handlers that only read:
+
+        db = get_read_db()
+        rows = db.execute("SELECT tag FROM tags").fetchall()
+
+    It is in autocommit and read-only mode, so no transaction stays open
+    until teardown and a stray write fails loudly. It comes from the
+    DATABASE_REPLICA_URL replica when one is set and reachable, otherwise
+    from the primary. Reads stay on the primary (the request's get_db()
+    connection) when this request has already used it, or when the
+    client's READ_AFTER_HEADER names a write the replica has not replayed
+    yet, so people see their own changes.
+    """
+    if "db" in g:
+        return g.db
+    if "read_db" not in g:
+        init_db()
+        conn = _replica_conn()
+        if conn is not None:
+            _read_session(conn, _pools["replica"])
+            try:
+                caught_up = _replica_caught_up(conn)
+            except psycopg2.Error:
+                caught_up = False
+            if caught_up:
+                g.read_db = PGDatabase(conn, replica=True)
+                return g.read_db
+            _pools["replica"].putconn(conn)
+        conn = get_pool().getconn()
+        _read_session(conn, get_pool())
+        g.read_db = PGDatabase(conn)
+    return g.read_db
+
+
 def close_db(e=None):
+    global _replica_down_until
     db = g.pop("db", None)
     if db is not None:
-        db.close()
+        get_pool().putconn(db.conn)
 
+    read_db = g.pop("read_db", None)
+    if read_db is not None:
+        conn = read_db.conn
+        if read_db.replica:
+            if conn.closed:
+                # the replica went away mid-request; give it time to come back
+                _replica_down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+            _pools["replica"].putconn(conn)
+            return
+        try:
+            if not conn.closed:
+                conn.set_session(readonly="DEFAULT", autocommit=False)
+        except psycopg2.Error:
+            pass
+        get_pool().putconn(conn)
 
-def init_db(app, schema_path="schema_pg.sql"):
-    # run schema once on startup
-    with app.app_context():
-        db = get_db()
-        with open(schema_path, "r", encoding="utf-8") as f:
-            sql = f.read()
-        for statement in sql.split(";"):
-            stmt = statement.strip()
-            if stmt:
-                db.execute(stmt)
-        db.commit()
+
+def init_db(app=None):
+    """
+    Apply pending schema migrations (see migrate.py), once per process.
+    get_db() calls this on first use, so nothing touches the database
+    until it is needed; app.warmup() calls it ahead of traffic. When the
+    schema is already current this is a single query and takes no locks.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        if not DATABASE_URL:
+            raise RuntimeError("DATABASE_URL is not set")
+        applied = migrate(DATABASE_URL)
+        if applied:
+            (app.logger if app else log).info("Applied migrations: %s", ", ".join(applied))
+        _schema_ready = True
+
+
+def warm_pool():
+    """Open this process's pools now (DB_POOL_MIN connections each) rather than on the first request."""
+    get_pool()
+    conn = _replica_conn()
+    if conn is not None:
+        _pools["replica"].putconn(conn)
@@ -0,0 +1,191 @@
+# backend/feed_cache.py
+"""
+In-memory cache of the newest posts for hot tags (GET /api/posts?tag=...).
+
+A tag is only cached once it has been requested FEED_ADMIT_HITS times
+recently; at most FEED_CACHE_TAGS tags are cached, and when a hotter tag
+needs the room the least requested one is evicted. Request counts are
+halved every FEED_DECAY_EVERY lookups so yesterday's popular course does
+not hold a slot forever.
+
+Each entry holds the newest FEED_CACHE_SIZE post summaries of one tag
+prefix, newest first, exactly as list_posts returns them. The invariant
+is that `posts` is always the newest len(posts) posts of that feed;
+`complete` says it is the whole feed. So a request can be answered from
+memory when the entry is complete or it asks for no more than we hold.
+
+Writes keep the entries current in place:
+
+    feed_cache.post_created(summary)     # after create_post commits
+    feed_cache.post_deleted(post_id, tags)
+
+A post tagged "CS/CS315/Lab" belongs to the feeds of "CS", "CS/CS315",
+"CS/CS315/Lab" and "" (all posts), so every ancestor prefix is updated.
+Entries also expire after FEED_CACHE_TTL seconds, which bounds how long a
+change made outside these hooks (e.g. a renamed handle) can be served.
+"""
+import os
+import threading
+import time
+from collections import Counter
+
+from coherence import on_resync, subscribe
+from db import REPLICA_MAX_LAG
+
+FEED_CACHE_TAGS = int(os.getenv("FEED_CACHE_TAGS", "64"))
+FEED_CACHE_SIZE = int(os.getenv("FEED_CACHE_SIZE", "100"))
+FEED_ADMIT_HITS = int(os.getenv("FEED_ADMIT_HITS", "3"))
+FEED_CACHE_TTL = float(os.getenv("FEED_CACHE_TTL", "300"))
+FEED_DECAY_EVERY = 10_000
+
+
+class _Feed:
+    __slots__ = ("posts", "complete", "filled_at")
+
+    def __init__(self, posts, complete):
+        self.posts = posts          # newest first
+        self.complete = complete    # True if posts is the whole feed
+        self.filled_at = time.monotonic()
+
+
+_lock = threading.Lock()
+_feeds = {}             # tag prefix -> _Feed
+_hits = Counter()       # tag prefix -> recent request count
+_lookups = 0
+_generation = 0         # bumped by every write, see fill()
+_changed_at = 0.0       # monotonic time of the last bump
+
+
+def prefixes(tag: str):
+    """
+    Every feed a post with `tag` appears in:
+
+        prefixes("CS/CS315/Lab") → ["", "CS", "CS/CS315", "CS/CS315/Lab"]
+
+    (list_posts?tag=X matches `tag = X OR tag LIKE 'X/%'`.)
+    """
+    out = [""]
+    for i, ch in enumerate(tag):
+        if ch == "/":
+            out.append(tag[:i])
+    out.append(tag)
+    return out
+
+
+def _decay():
+    for key in list(_hits):
+        _hits[key] //= 2
+        if not _hits[key]:
+            del _hits[key]
+
+
+def lookup(tag: str, limit=None):
+    """
+    Posts for `tag` (newest first, at most `limit`) if the cache can
+    answer, else None. Also counts the request toward admission.
+    Returns (posts_or_None, generation); pass the generation to fill().
+    """
+    global _lookups
+    with _lock:
+        _hits[tag] += 1
+        _lookups += 1
+        if _lookups % FEED_DECAY_EVERY == 0:
+            _decay()
+
+        feed = _feeds.get(tag)
+        if feed is not None and time.monotonic() - feed.filled_at > FEED_CACHE_TTL:
+            del _feeds[tag]
+            feed = None
+        if feed is not None and (feed.complete or (limit is not None and limit <= len(feed.posts))):
+            return feed.posts[:limit], _generation
+        return None, _generation
+
+
+def _admit(tag) -> bool:
+    if tag in _feeds:
+        return True
+    if _hits[tag] < FEED_ADMIT_HITS:
+        return False
+    if len(_feeds) < FEED_CACHE_TAGS:
+        return True
+    coldest = min(_feeds, key=lambda t: _hits[t])
+    if _hits[coldest] >= _hits[tag]:
+        return False
+    del _feeds[coldest]
+    return True
+
+
+def fill(tag: str, posts, limit, generation, replica=False) -> bool:
+    """
+    Offer the DB result for `tag` (queried with `limit`, None for all).
+    Cached if the tag is hot and nothing was written since lookup()
+    returned `generation` (otherwise the rows may already be stale).
+    Rows read from a replica (`replica=True`) are also refused within
+    REPLICA_MAX_LAG of the last write, as the replica may not have it yet.
+    """
+    with _lock:
+        if generation != _generation or not _admit(tag):
+            return False
+        if replica and time.monotonic() - _changed_at < REPLICA_MAX_LAG:
+            return False
+        complete = (limit is None or len(posts) < limit) and len(posts) <= FEED_CACHE_SIZE
+        _feeds[tag] = _Feed(list(posts[:FEED_CACHE_SIZE]), complete)
+        return True
+
+
+def post_created(summary):
+    """Put a new post (a list_posts-style dict) at the top of every cached feed it belongs to."""
+    global _generation, _changed_at
+    keys = {p for tag in summary.get("tags") or [] for p in prefixes(tag)} or {""}
+    order = (summary["created_at"], summary["postID"])
+    with _lock:
+        _generation += 1
+        _changed_at = time.monotonic()
+        for key in keys:
+            feed = _feeds.get(key)
+            if feed is None or any(p["postID"] == summary["postID"] for p in feed.posts):
+                # not cached, or already there: a fill that ran between the
+                # commit and this call read the new post from the DB
+                continue
+            # normally the top; a transaction that started earlier but
+            # committed later may land below newer posts
+            i = 0
+            while i < len(feed.posts) and (feed.posts[i]["created_at"], feed.posts[i]["postID"]) > order:
+                i += 1
+            if i == len(feed.posts) and not feed.complete:
+                continue  # older than everything we hold
+            feed.posts.insert(i, summary)
+            if len(feed.posts) > FEED_CACHE_SIZE:
+                feed.posts.pop()
+                feed.complete = False
+
+
+def post_deleted(post_id, tags):
+    """Drop a deleted post from every cached feed it was in."""
+    global _generation, _changed_at
+    keys = {p for tag in tags for p in prefixes(tag)} or {""}
+    with _lock:
+        _generation += 1
+        _changed_at = time.monotonic()
+        for key in keys:
+            feed = _feeds.get(key)
+            if feed is not None:
+                feed.posts = [p for p in feed.posts if p["postID"] != post_id]
+
+
+def invalidate(tags=None):
+    """Forget the feeds of `tags` (and their prefixes), or every feed."""
+    global _generation, _changed_at
+    with _lock:
+        _generation += 1
+        _changed_at = time.monotonic()
+        if tags is None:
+            _feeds.clear()
+            return
+        for key in {p for tag in tags for p in prefixes(tag)} or {""}:
+            _feeds.pop(key, None)
+
+
+# another worker created or deleted a post (see coherence.py)
+subscribe("posts", lambda payload: invalidate(payload.get("tags") or []))
+on_resync(invalidate)
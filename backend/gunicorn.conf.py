@@ -0,0 +1,67 @@
+# backend/gunicorn.conf.py
+"""
+Production server settings:
+
+    gunicorn -c gunicorn.conf.py
+
+Every value can be overridden from the environment (or on the command
+line). Reloading:
+
+    kill -HUP <master pid>    # new workers with the same preloaded code
+    kill -USR2 <master pid>   # start a new master on new code; then
+    kill -QUIT <old master>   # stop the old master once the new one is up
+
+HUP does not pick up code changes: with preload_app the code is imported
+once in the master. Use USR2 + QUIT to deploy new code without downtime.
+"""
+import multiprocessing
+import os
+
+wsgi_app = "wsgi:app"
+bind = os.getenv("BIND", "0.0.0.0:5000")
+
+# Worker model: a few processes, each with a small thread pool. Threads
+# overlap DB waits; processes spread CPU work (JSON, JWT checks) over cores.
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = "gthread"
+
+# Import and warm up the app (schema setup, trie load, JWKS) once in the
+# master, before fork
+preload_app = True
+
+# Keep connections from the frontend/proxy open between requests
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+
+# Recycle workers now and then so slow leaks can't accumulate
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "500"))
+
+# access log to stdout by default; set GUNICORN_ACCESSLOG= (empty) to turn it off
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-") or None
+
+
+def when_ready(server):
+    # runs in the master after the preload, before any worker is forked
+    from app import warmup
+    from wsgi import app
+    # no listener here: the master serves nothing, and post_fork starts
+    # one per worker
+    warmup(app, listen=False)
+
+
+def pre_fork(server, worker):
+    # connections opened while preloading must not be shared with children
+    from db import close_pool
+    close_pool()
+
+
+def post_fork(server, worker):
+    # threads don't survive fork; each worker starts its own listener
+    from coherence import start_listener
+    start_listener()
+    # and opens its own DB connections before taking requests
+    from db import warm_pool
+    warm_pool()
@@ -0,0 +1,108 @@
+# backend/loadtest/auth_stub.py
+"""
+Local stand-in for Auth0, so the API can be load tested without a tenant.
+
+Serves a JWKS document for a locally generated RSA key and mints tokens
+the backend accepts:
+
+    python loadtest/auth_stub.py --port 5055     # leave running
+
+and start the backend with
+
+    AUTH0_DOMAIN=loadtest.local
+    AUTH0_AUDIENCE=loadtest-api
+    AUTH0_JWKS_URL=http://127.0.0.1:5055/.well-known/jwks.json
+
+The private key is kept in loadtest/.stub_key.pem so the scenario runner
+(which imports mint_token) signs with the same key the server publishes.
+"""
+import argparse
+import json
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+DOMAIN = os.getenv("AUTH0_DOMAIN", "loadtest.local")
+AUDIENCE = os.getenv("AUTH0_AUDIENCE", "loadtest-api")
+KEY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".stub_key.pem")
+KID = "loadtest-key"
+HANDLE_CLAIM = "https://uic.wiki/handle"
+
+
+def _private_pem():
+    if not os.path.exists(KEY_PATH):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        with open(KEY_PATH, "wb") as f:
+            f.write(pem)
+    with open(KEY_PATH, "rb") as f:
+        return f.read()
+
+
+def jwks():
+    key = serialization.load_pem_private_key(_private_pem(), password=None)
+    public_pem = key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    pub = jwk.construct(public_pem, "RS256").to_dict()
+    pub = {k: v.decode() if isinstance(v, bytes) else v for k, v in pub.items()}
+    pub.update({"kid": KID, "use": "sig"})
+    return {"keys": [pub]}
+
+
+def mint_token(sub, handle, ttl=3600):
+    """A signed access token shaped like the ones Auth0 issues to the frontend."""
+    now = int(time.time())
+    claims = {
+        "sub": sub,
+        "aud": AUDIENCE,
+        "iss": f"https://{DOMAIN}/",
+        "iat": now,
+        "exp": now + ttl,
+        HANDLE_CLAIM: handle,
+        "email": f"{handle}@uic.edu",
+    }
+    return jwt.encode(claims, _private_pem().decode(), algorithm="RS256", headers={"kid": KID})
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/.well-known/jwks.json":
+            self.send_error(404)
+            return
+        body = json.dumps(jwks()).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--print-token", metavar="SUB", help="print a token for SUB and exit")
+    args = parser.parse_args()
+
+    if args.print_token:
+        print(mint_token(args.print_token, args.print_token.split("|")[-1]))
+        return
+
+    print(f"JWKS at http://127.0.0.1:{args.port}/.well-known/jwks.json")
+    ThreadingHTTPServer(("127.0.0.1", args.port), _Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# backend/loadtest/scenarios.py
+"""
+Scripted end-to-end scenarios against a running backend, reporting
+throughput and p50/p95/p99 per endpoint.
+
+Scenarios (each virtual user loops, picking one by --mix weight):
+  browse   topic page: posts for a course, subtopic chips, record recent,
+           load bookmarks
+  user     user page: /api/me, then the bookmarked posts by id
+  bookmark bookmark a random post, then remove it
+  create   create a post in a course (kept, like real traffic)
+
+Setup: a local Postgres seeded with seed.py, auth_stub.py running, and the
+backend started with the AUTH0_* variables auth_stub.py prints. Then
+
+    python loadtest/scenarios.py --base http://127.0.0.1:5000 \\
+        --users 500 --concurrency 16 --seconds 60
+
+--users must not exceed the number of users seeded.
+"""
+import argparse
+import random
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+from auth_stub import mint_token
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, label, seconds, ok):
+        with self.lock:
+            self.latencies[label].append(seconds)
+            if not ok:
+                self.errors[label] += 1
+
+
+class VirtualUser:
+    def __init__(self, args, idx, courses, stats):
+        self.args = args
+        self.rng = random.Random(args.seed + idx)
+        self.courses = courses
+        self.stats = stats
+        self.session = requests.Session()
+        n = self.rng.randrange(args.users)
+        self.sub = f"auth0|load{n}"
+        self.auth = {"Authorization": f"Bearer {mint_token(self.sub, f'load{n}')}"}
+
+    def call(self, label, method, path, auth=False, **kwargs):
+        headers = dict(self.auth) if auth else {}
+        start = time.perf_counter()
+        try:
+            r = self.session.request(
+                method, self.args.base + path, headers=headers, timeout=30, **kwargs
+            )
+            ok = r.status_code < 400
+        except requests.RequestException:
+            r, ok = None, False
+        self.stats.record(label, time.perf_counter() - start, ok)
+        return r
+
+    def course(self):
+        # popular courses first: weight 1/rank
+        weights = [1 / (i + 1) for i in range(len(self.courses))]
+        return self.rng.choices(self.courses, weights)[0]
+
+    def browse(self):
+        tag = self.course()
+        self.call("GET /api/posts?tag", "GET", "/api/posts", params={"tag": tag})
+        self.call("GET /api/tags/children", "GET", "/api/tags/children", params={"tag": tag})
+        self.call("POST /api/recent-topics", "POST", "/api/recent-topics", json={"user": self.sub, "tag": tag})
+        self.call("GET /api/bookmarks", "GET", "/api/bookmarks", auth=True)
+
+    def user(self):
+        r = self.call("GET /api/me", "GET", "/api/me", auth=True)
+        if r is None or r.status_code != 200:
+            return
+        ids = r.json().get("bookmarks") or "[]"
+        ids = ids.strip("[]").replace(" ", "")
+        if ids:
+            self.call("GET /api/posts/by_ids", "GET", "/api/posts/by_ids", params={"ids": ids})
+
+    def bookmark(self):
+        post_id = self.rng.randint(1, self.args.max_post_id)
+        self.call("POST /api/bookmarks/<id>", "POST", f"/api/bookmarks/{post_id}", auth=True)
+        self.call("DELETE /api/bookmarks/<id>", "DELETE", f"/api/bookmarks/{post_id}", auth=True)
+
+    def create(self):
+        tag = self.course()
+        text = "<p>" + " ".join("word" for _ in range(self.rng.randint(50, 400))) + "</p>"
+        self.call(
+            "POST /api/posts", "POST", "/api/posts", auth=True,
+            json={"title": f"Load test in {tag}", "text": text, "tags": [tag]},
+        )
+
+    def run(self, deadline, mix):
+        names, weights = zip(*mix.items())
+        while time.perf_counter() < deadline:
+            getattr(self, self.rng.choices(names, weights)[0])()
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def _parse_mix(raw):
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base", default="http://127.0.0.1:5000")
+    parser.add_argument("--users", type=int, default=500, help="seeded users to log in as")
+    parser.add_argument("--max-post-id", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--mix", default="browse=60,user=20,bookmark=15,create=5")
+    parser.add_argument("--seed", type=int, default=351)
+    args = parser.parse_args()
+    mix = _parse_mix(args.mix)
+
+    tags = requests.get(args.base + "/api/tags", timeout=30).json()
+    courses = [t for t in tags if t.count("/") == 1] or tags
+    if not courses:
+        raise SystemExit("no tags found; seed the database first (loadtest/seed.py)")
+
+    stats = Stats()
+    deadline = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(target=VirtualUser(args, i, courses, stats).run, args=(deadline, mix))
+        for i in range(args.concurrency)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in stats.latencies.values())
+    print(f"{total} requests in {elapsed:.1f}s = {total / elapsed:.1f} req/s, concurrency {args.concurrency}")
+    print(f"{'endpoint':<30} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for label in sorted(stats.latencies):
+        lat = [x * 1000 for x in stats.latencies[label]]
+        print(
+            f"{label:<30} {len(lat) / elapsed:>8.1f} {_pct(lat, 50):>8.1f} "
+            f"{_pct(lat, 95):>8.1f} {_pct(lat, 99):>8.1f} {stats.errors[label]:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
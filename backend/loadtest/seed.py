@@ -0,0 +1,176 @@
+# backend/loadtest/seed.py
+"""
+Synthetic data for load tests: users, hierarchical course tags, posts with
+realistic body sizes (log-normal, median ~1 KB), and bookmarks. Popular
+courses get most of the posts (Zipf-like), like real course traffic.
+
+    DATABASE_URL=postgresql://localhost/uicwiki_load \\
+        python loadtest/seed.py --users 500 --posts 20000 --reset
+
+Seeded users are auth0|load0 .. auth0|load<N-1>; scenarios.py logs in as
+them with tokens from auth_stub.py. --reset TRUNCATEs every table first,
+so only point it at a throwaway database.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+# run from backend/ as a script: make the backend modules importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from migrate import migrate  # noqa: E402
+
+DEPARTMENTS = ["CS", "MATH", "PHYS", "CHEM", "BIOS", "ECE", "ME", "STAT", "ECON", "PSCH"]
+SECTIONS = ["Lectures", "Homework", "Labs", "Exams", "Projects"]
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua recursion pointer exam lab trie "
+    "hash midterm proof integral vector graph queue stack heap"
+).split()
+
+
+def make_tags(rng, depts, courses, sections):
+    """Return (all tag paths, course paths in popularity order)."""
+    tags, course_paths = [], []
+    for dept in DEPARTMENTS[:depts]:
+        tags.append(dept)
+        numbers = rng.sample(range(100, 600), courses)
+        for num in numbers:
+            course = f"{dept}/{dept}{num}"
+            tags.append(course)
+            course_paths.append(course)
+            for sec in SECTIONS[:sections]:
+                tags.append(f"{course}/{sec}")
+    rng.shuffle(course_paths)
+    return tags, course_paths
+
+
+def body(rng):
+    target = min(20_000, int(rng.lognormvariate(7.0, 0.8)))  # median ~1.1 KB
+    paragraphs, size = [], 0
+    while size < target:
+        p = "<p>" + " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 80))) + "</p>"
+        paragraphs.append(p)
+        size += len(p)
+    return "".join(paragraphs)
+
+
+def pick_course(rng, course_paths):
+    # Zipf-ish: weight 1/rank
+    weights = [1 / (i + 1) for i in range(len(course_paths))]
+    return rng.choices(course_paths, weights)[0]
+
+
+def seed(conn, args):
+    rng = random.Random(args.seed)
+    cur = conn.cursor()
+
+    if args.reset:
+        cur.execute(
+            "TRUNCATE post_tags, posts, tags, users, recent_topics RESTART IDENTITY CASCADE"
+        )
+
+    users = [(f"auth0|load{i}", f"load{i}", f"load{i}@uic.edu") for i in range(args.users)]
+    execute_values(
+        cur,
+        "INSERT INTO users (sub, handle, email) VALUES %s ON CONFLICT (sub) DO NOTHING",
+        users,
+    )
+
+    tags, course_paths = make_tags(rng, args.depts, args.courses, args.sections)
+    execute_values(cur, "INSERT INTO tags (tag) VALUES %s ON CONFLICT DO NOTHING", [(t,) for t in tags])
+
+    now = datetime.utcnow()
+    created = {sub: [] for sub, _, _ in users}
+    post_tags = []
+    batch = 1000
+    for start in range(0, args.posts, batch):
+        rows, picks = [], []
+        for _ in range(min(batch, args.posts - start)):
+            author = rng.choice(users)[0]
+            course = pick_course(rng, course_paths)
+            ptags = [course]
+            if args.sections and rng.random() < 0.6:
+                ptags = [f"{course}/{rng.choice(SECTIONS[:args.sections])}"]
+            if rng.random() < 0.15:
+                ptags.append(pick_course(rng, course_paths))
+            rows.append((
+                author,
+                f"{course} question {rng.randint(1, 10**6)}",
+                body(rng),
+                now - timedelta(seconds=rng.randint(0, 180 * 86400)),
+            ))
+            picks.append((author, set(ptags)))
+        ids = execute_values(
+            cur,
+            "INSERT INTO posts (author_sub, title, text, created_at) VALUES %s RETURNING postid",
+            rows,
+            fetch=True,
+            page_size=batch,
+        )
+        for (post_id,), (author, ptags) in zip(ids, picks):
+            created[author].append(post_id)
+            post_tags.extend((post_id, t) for t in ptags)
+
+    execute_values(
+        cur,
+        "INSERT INTO post_tags (postID, tag) VALUES %s ON CONFLICT DO NOTHING",
+        post_tags,
+        page_size=5000,
+    )
+
+    all_ids = [pid for ids in created.values() for pid in ids]
+    per_user = [
+        (
+            sub,
+            json.dumps(created[sub]),
+            json.dumps(rng.sample(all_ids, min(len(all_ids), args.bookmarks))),
+        )
+        for sub, _, _ in users
+    ]
+    execute_values(
+        cur,
+        """
+        UPDATE users AS u
+        SET created_posts = v.created, bookmarks = v.bookmarks
+        FROM (VALUES %s) AS v(sub, created, bookmarks)
+        WHERE u.sub = v.sub
+        """,
+        per_user,
+    )
+    cur.execute("ANALYZE")
+    conn.commit()
+    return len(tags), len(post_tags)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--posts", type=int, default=20_000)
+    parser.add_argument("--depts", type=int, default=8)
+    parser.add_argument("--courses", type=int, default=12, help="courses per department")
+    parser.add_argument("--sections", type=int, default=3, help="sub-tags per course")
+    parser.add_argument("--bookmarks", type=int, default=20, help="bookmarks per user")
+    parser.add_argument("--seed", type=int, default=351)
+    parser.add_argument("--reset", action="store_true", help="TRUNCATE all tables first")
+    args = parser.parse_args()
+
+    dsn = os.environ.get("DATABASE_URL")
+    if not dsn:
+        sys.exit("DATABASE_URL is not set")
+    migrate(dsn)
+    conn = psycopg2.connect(dsn)
+    try:
+        n_tags, n_links = seed(conn, args)
+    finally:
+        conn.close()
+    print(f"seeded {args.users} users, {n_tags} tags, {args.posts} posts, {n_links} post tags")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# backend/loadtest/slow_clients.py
+"""
+Concurrency-limit load test: how many slow clients can a server hold open
+while still answering fast requests?
+
+Opens --clients connections that each trickle a small POST body to
+/api/recent-topics over --slow-seconds (a phone on a bad network), and
+meanwhile sends a GET /api/health probe every --probe-interval seconds.
+Neither endpoint needs auth, and guest recents never touch the DB.
+
+Run it against each serving mode, e.g.
+
+    flask run --port 5000                       # sync (threaded dev server)
+    uvicorn asgi:application --port 5001        # async
+
+    python loadtest/slow_clients.py --port 5000 --clients 300
+    python loadtest/slow_clients.py --port 5001 --clients 300
+
+A mode that pins a thread per connection shows probe latency climbing to
+--slow-seconds (or connection failures) once the clients exceed its
+threads; the async mode keeps probes fast.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+
+async def _slow_client(host, port, idx, slow_seconds):
+    body = json.dumps({"user": f"guest:load-{idx}", "tag": "CS/CS315"}).encode()
+    head = (
+        f"POST /api/recent-topics HTTP/1.1\r\n"
+        f"Host: {host}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n"
+    ).encode()
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(head)
+        await writer.drain()
+        step = slow_seconds / len(body)
+        for i in range(len(body)):
+            writer.write(body[i:i + 1])
+            await writer.drain()
+            await asyncio.sleep(step)
+        status = await reader.readline()
+        writer.close()
+        return status.startswith(b"HTTP/1.1 200") or status.startswith(b"HTTP/1.0 200")
+    except OSError:
+        return False
+
+
+async def _probe(host, port, timeout):
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        writer.write(
+            f"GET /api/health HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode()
+        )
+        await writer.drain()
+        status = await asyncio.wait_for(reader.readline(), timeout)
+        writer.close()
+        ok = b" 200 " in status
+    except (OSError, asyncio.TimeoutError):
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def _pct(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+async def run(args):
+    slow = [
+        asyncio.create_task(_slow_client(args.host, args.port, i, args.slow_seconds))
+        for i in range(args.clients)
+    ]
+    # let the slow clients occupy the server before probing
+    await asyncio.sleep(0.5)
+
+    probes = []
+    deadline = time.perf_counter() + args.slow_seconds - 1
+    while time.perf_counter() < deadline:
+        probes.append(asyncio.create_task(_probe(args.host, args.port, args.slow_seconds * 2)))
+        await asyncio.sleep(args.probe_interval)
+
+    slow_ok = sum(await asyncio.gather(*slow))
+    probe_results = await asyncio.gather(*probes)
+    latencies = [lat * 1000 for ok, lat in probe_results if ok]
+
+    print(f"slow clients   : {slow_ok}/{args.clients} completed")
+    print(f"probes         : {len(latencies)}/{len(probe_results)} ok")
+    if latencies:
+        print(
+            "probe latency  : p50 {:.1f} ms  p95 {:.1f} ms  max {:.1f} ms  mean {:.1f} ms".format(
+                _pct(latencies, 50), _pct(latencies, 95), max(latencies),
+                statistics.mean(latencies),
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--slow-seconds", type=float, default=10.0)
+    parser.add_argument("--probe-interval", type=float, default=0.1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
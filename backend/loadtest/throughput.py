@@ -0,0 +1,113 @@
+# backend/loadtest/throughput.py
+"""
+Closed-loop throughput test: --concurrency clients each send GET requests
+back to back (reusing keep-alive connections when the server allows it)
+for --seconds, then report requests/s and latency percentiles per path.
+
+    python loadtest/throughput.py --port 5000 --path /api/health \\
+        --path "/api/posts?tag=CS" --concurrency 16 --seconds 20
+"""
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+
+
+class _Conn:
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def get(self, path):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\nConnection: keep-alive\r\n\r\n".encode()
+        )
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("server closed the connection")
+        version, status = status_line.split()[:2]
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            k, _, v = line.decode("latin1").partition(":")
+            headers[k.strip().lower()] = v.strip().lower()
+
+        if "content-length" in headers:
+            await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            await self.reader.read()
+
+        if version == b"HTTP/1.0" or headers.get("connection") == "close" or "content-length" not in headers:
+            self.close()
+        return int(status)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+async def _client(args, idx, deadline, latencies, errors):
+    conn = _Conn(args.host, args.port)
+    n = idx
+    while time.perf_counter() < deadline:
+        path = args.path[n % len(args.path)]
+        n += 1
+        start = time.perf_counter()
+        try:
+            status = await conn.get(path)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+            conn.close()
+            errors[path] += 1
+            continue
+        if status >= 400:
+            errors[path] += 1
+        latencies[path].append(time.perf_counter() - start)
+    conn.close()
+
+
+async def run(args):
+    latencies, errors = defaultdict(list), defaultdict(int)
+    deadline = time.perf_counter() + args.seconds
+    await asyncio.gather(*(
+        _client(args, i, deadline, latencies, errors) for i in range(args.concurrency)
+    ))
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"total: {total / args.seconds:.1f} req/s over {args.seconds:.0f}s, concurrency {args.concurrency}")
+    for path in args.path:
+        lat = [x * 1000 for x in latencies[path]]
+        if not lat:
+            print(f"{path}: no successful requests ({errors[path]} errors)")
+            continue
+        print(
+            f"{path}: {len(lat) / args.seconds:.1f} req/s  p50 {_pct(lat, 50):.1f} ms  "
+            f"p95 {_pct(lat, 95):.1f} ms  p99 {_pct(lat, 99):.1f} ms  errors {errors[path]}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--path", action="append", help="may be given several times")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=20.0)
+    args = parser.parse_args()
+    args.path = args.path or ["/api/health"]
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# backend/metrics.py
+"""
+Per-request instrumentation.
+
+For every request we record:
+  - latency, per endpoint (histogram)
+  - how many DB queries ran and how long they took (PGDatabase.execute
+    calls record_query)
+  - queries repeated many times in one request, which usually means an
+    N+1 loop (e.g. one tag lookup per post)
+
+Slow queries are logged with their SQL normalized (placeholders and IN
+lists collapsed) so the same statement groups together. Each response gets
+a Server-Timing header, and GET /api/metrics exposes everything in the
+Prometheus text format. Numbers are per worker process.
+
+/api/metrics shows SQL text, so it is off unless METRICS_TOKEN is set, and
+scrapers must then send it as a bearer token:
+
+    curl -H "Authorization: Bearer $METRICS_TOKEN" localhost:5000/api/metrics
+"""
+import bisect
+import hmac
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import Blueprint, Response, g, has_app_context, jsonify, request
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# seconds; roughly what Prometheus client libraries use
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+log = logging.getLogger("uicwiki.metrics")
+metrics_bp = Blueprint("metrics", __name__)
+
+_lock = threading.Lock()
+_latency = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))  # (method, endpoint) -> bucket counts
+_latency_sum = defaultdict(float)
+_requests = Counter()          # (method, endpoint, status) -> count
+_db_queries = Counter()        # endpoint -> queries
+_db_seconds = defaultdict(float)
+_repeated = Counter()          # endpoint -> requests flagged as N+1
+_slow_queries = Counter()      # normalized sql -> count
+
+_WS = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))+\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Collapse a statement to its shape:
+
+        SELECT tag FROM post_tags WHERE postID IN (?, ?, ?)
+        → SELECT tag FROM post_tags WHERE postID IN (?...)
+    """
+    q = _STRING.sub("?", query)
+    q = _NUMBER.sub("?", q)
+    q = _IN_LIST.sub("(?...)", q)
+    return _WS.sub(" ", q).strip()
+
+
+def _endpoint():
+    rule = request.url_rule
+    return rule.rule if rule is not None else "<unmatched>"
+
+
+def record_query(query: str, seconds: float):
+    """Called by PGDatabase.execute for every statement."""
+    slow = seconds * 1000 >= SLOW_QUERY_MS
+    if not has_app_context():
+        if slow:
+            log.warning("slow query (%.1f ms): %s", seconds * 1000, normalize_sql(query))
+        return
+
+    stats = g.get("_db_stats")
+    if stats is None:
+        stats = g._db_stats = {"count": 0, "seconds": 0.0, "shapes": Counter()}
+    stats["count"] += 1
+    stats["seconds"] += seconds
+    shape = normalize_sql(query)
+    stats["shapes"][shape] += 1
+
+    if slow:
+        with _lock:
+            _slow_queries[shape] += 1
+        log.warning("slow query (%.1f ms): %s", seconds * 1000, shape)
+
+
+def _before():
+    g._req_start = time.perf_counter()
+
+
+def _after(resp):
+    start = g.pop("_req_start", None)
+    if start is None:
+        return resp
+    elapsed = time.perf_counter() - start
+    endpoint = _endpoint()
+    stats = g.pop("_db_stats", None) or {"count": 0, "seconds": 0.0, "shapes": Counter()}
+
+    repeated = [(shape, n) for shape, n in stats["shapes"].items() if n >= N_PLUS_ONE_THRESHOLD]
+    for shape, n in repeated:
+        log.warning("possible N+1 on %s %s: %d x %s", request.method, endpoint, n, shape)
+
+    with _lock:
+        key = (request.method, endpoint)
+        _latency[key][bisect.bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+        _latency_sum[key] += elapsed
+        _requests[(request.method, endpoint, resp.status_code)] += 1
+        _db_queries[endpoint] += stats["count"]
+        _db_seconds[endpoint] += stats["seconds"]
+        if repeated:
+            _repeated[endpoint] += 1
+
+    resp.headers["Server-Timing"] = (
+        f'app;dur={elapsed * 1000:.1f}, '
+        f'db;dur={stats["seconds"] * 1000:.1f};desc="{stats["count"]} queries"'
+    )
+    return resp
+
+
+def init_metrics(app):
+    app.before_request(_before)
+    app.after_request(_after)
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+@metrics_bp.get("/metrics")
+def metrics():
+    """Prometheus text exposition of this worker's counters."""
+    sent = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not (METRICS_TOKEN and hmac.compare_digest(sent.encode(), METRICS_TOKEN.encode())):
+        return jsonify({"error": "Not found"}), 404
+    lines = []
+    with _lock:
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for (method, endpoint), counts in sorted(_latency.items()):
+            labels = f'method="{method}",endpoint="{_label(endpoint)}"'
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, counts):
+                cumulative += n
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {_latency_sum[(method, endpoint)]:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {cumulative}")
+
+        lines.append("# TYPE http_requests_total counter")
+        for (method, endpoint, status), n in sorted(_requests.items()):
+            lines.append(
+                f'http_requests_total{{method="{method}",endpoint="{_label(endpoint)}",status="{status}"}} {n}'
+            )
+
+        lines.append("# TYPE db_queries_total counter")
+        for endpoint, n in sorted(_db_queries.items()):
+            lines.append(f'db_queries_total{{endpoint="{_label(endpoint)}"}} {n}')
+
+        lines.append("# TYPE db_query_seconds_total counter")
+        for endpoint, s in sorted(_db_seconds.items()):
+            lines.append(f'db_query_seconds_total{{endpoint="{_label(endpoint)}"}} {s:.6f}')
+
+        lines.append("# TYPE db_repeated_query_requests_total counter")
+        for endpoint, n in sorted(_repeated.items()):
+            lines.append(f'db_repeated_query_requests_total{{endpoint="{_label(endpoint)}"}} {n}')
+
+        lines.append("# TYPE db_slow_queries_total counter")
+        for shape, n in sorted(_slow_queries.items()):
+            lines.append(f'db_slow_queries_total{{query="{_label(shape)}"}} {n}')
+
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,116 @@
+# backend/migrate.py
+"""
+Versioned schema migrations.
+
+Each file in migrations/ is named <version>_<name>.sql and is applied once,
+in version order, in its own transaction. Applied versions are recorded in
+the schema_migrations table:
+
+    flask migrate          # apply anything pending
+
+On startup, migrate() first checks the recorded version without taking any
+locks and returns at once if the schema is current. Otherwise it takes a
+Postgres advisory lock, so that when several workers boot together only one
+of them runs the migrations and the others wait and then see nothing left
+to do.
+
+Files are sent to Postgres whole (no splitting on ';'), so function bodies
+and string literals are safe.
+"""
+import os
+import re
+
+import psycopg2
+from psycopg2 import errors
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# arbitrary, but fixed: every process must use the same key
+_LOCK_KEY = 35108
+
+_FILENAME = re.compile(r"^(\d+)_([\w-]+)\.sql$")
+
+
+def available_migrations(directory=MIGRATIONS_DIR):
+    """Return [(version, name, path)] for every migration file, oldest first."""
+    found = []
+    for fname in os.listdir(directory):
+        m = _FILENAME.match(fname)
+        if m:
+            found.append((int(m.group(1)), m.group(2), os.path.join(directory, fname)))
+    found.sort()
+    return found
+
+
+def current_version(conn):
+    """Highest applied version, or 0 for a database that has never been migrated."""
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+        version = cur.fetchone()[0]
+    except errors.UndefinedTable:
+        version = 0
+    conn.rollback()
+    return version
+
+
+def _apply_pending(conn, migrations):
+    cur = conn.cursor()
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+          version     INTEGER PRIMARY KEY,
+          name        TEXT NOT NULL,
+          applied_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    conn.commit()
+
+    # re-read under the lock: another worker may have finished meanwhile
+    done = current_version(conn)
+    applied = []
+    for version, name, path in migrations:
+        if version <= done:
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            sql = f.read()
+        try:
+            cur.execute(sql)
+            cur.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                (version, name),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(f"{version:04d}_{name}")
+    return applied
+
+
+def migrate(dsn, directory=MIGRATIONS_DIR):
+    """
+    Bring the database at `dsn` up to the newest migration.
+    Returns the list of migrations applied (empty when already current).
+    """
+    migrations = available_migrations(directory)
+    if not migrations:
+        return []
+    latest = migrations[-1][0]
+
+    conn = psycopg2.connect(dsn)
+    try:
+        # fast path: one query, no locks
+        if current_version(conn) >= latest:
+            return []
+
+        cur = conn.cursor()
+        cur.execute("SELECT pg_advisory_lock(%s)", (_LOCK_KEY,))
+        try:
+            return _apply_pending(conn, migrations)
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (_LOCK_KEY,))
+            conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,9 @@
+-- ========================================
+-- RECENT TOPICS (shared by all workers when SHARED_STATE=1)
+-- ========================================
+CREATE TABLE IF NOT EXISTS recent_topics (
+  user_key        TEXT PRIMARY KEY,            -- Auth0 sub or "guest:<id>"
+  topics          TEXT NOT NULL DEFAULT '[]',  -- JSON list, most recent first
+  version         INTEGER NOT NULL DEFAULT 0,  -- bumped on every write
+  updated_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
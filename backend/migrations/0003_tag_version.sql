@@ -0,0 +1,30 @@
+-- ========================================
+-- TAG VERSION (stamp for TAG_TRIE snapshots, see tag_snapshot.py)
+-- ========================================
+-- One row, bumped by every statement that changes tags or post_tags.
+-- The bump is part of the writer's transaction, so a snapshot stamped
+-- with version N describes exactly the committed state at N.
+CREATE TABLE IF NOT EXISTS tag_version (
+  id       INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+  version  BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO tag_version (id, version) VALUES (1, 0)
+ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_tag_version() RETURNS trigger AS $$
+BEGIN
+  UPDATE tag_version SET version = version + 1 WHERE id = 1;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tags_bump_version ON tags;
+CREATE TRIGGER tags_bump_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON tags
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_tag_version();
+
+DROP TRIGGER IF EXISTS post_tags_bump_version ON post_tags;
+CREATE TRIGGER post_tags_bump_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON post_tags
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_tag_version();
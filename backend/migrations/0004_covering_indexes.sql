@@ -0,0 +1,34 @@
+-- ========================================
+-- INDEXES FOR THE HOT READ PATHS
+-- ========================================
+-- Each index matches a query shape; python -m bench.plan_check verifies
+-- that those queries still use them.
+
+-- list_posts expands "CS" to "CS" OR "CS/%" (LIKE). The primary key only
+-- serves LIKE prefixes under the C collation; text_pattern_ops does
+-- under any collation.
+CREATE INDEX IF NOT EXISTS idx_tags_tag_pattern ON tags (tag text_pattern_ops);
+
+-- Feeds: exactly the ORDER BY of list_posts (postID breaks ties), so a
+-- LIMIT reads the newest rows in order with no sort. Replaces the
+-- created_at-only index.
+CREATE INDEX IF NOT EXISTS idx_posts_feed ON posts (created_at DESC, postID DESC);
+DROP INDEX IF EXISTS idx_posts_created_at;
+
+-- Profile page: one author's posts, newest first (also serves the
+-- author_sub foreign key)
+CREATE INDEX IF NOT EXISTS idx_posts_author_created ON posts (author_sub, created_at DESC);
+
+-- Profile lookup by handle
+CREATE INDEX IF NOT EXISTS idx_users_handle ON users (handle);
+
+-- Posts under a tag: (tag, postID) answers "which posts carry these
+-- tags" and the orphan-tag checks from the index alone. Replaces the
+-- tag-only index, which it covers.
+CREATE INDEX IF NOT EXISTS idx_post_tags_tag_post ON post_tags (tag, postID);
+DROP INDEX IF EXISTS idx_post_tags_tag;
+
+ANALYZE tags;
+ANALYZE posts;
+ANALYZE users;
+ANALYZE post_tags;
@@ -0,0 +1,30 @@
+-- ========================================
+-- TAG VERSION: BUMP ONLY WHEN THE SET OF TAGS CHANGES
+-- ========================================
+-- 0003 bumped tag_version after every statement on tags or post_tags,
+-- including INSERT ... ON CONFLICT DO NOTHING that inserted nothing. So
+-- every create_post updated the single tag_version row about twice per
+-- tag and held its lock until commit (serializing post writes across all
+-- workers), and every post made the trie snapshot stale.
+--
+-- Now only a tag path actually added, removed or renamed bumps it. Post
+-- counts per tag are no longer versioned: a snapshot's counts may lag by
+-- up to TAG_SNAPSHOT_MAX_AGE (see tag_trie.load_tag_trie_snapshot).
+DROP TRIGGER IF EXISTS post_tags_bump_version ON post_tags;
+DROP TRIGGER IF EXISTS tags_bump_version ON tags;
+
+-- fires only for rows really inserted or deleted (not ON CONFLICT skips)
+CREATE TRIGGER tags_bump_version
+  AFTER INSERT OR DELETE ON tags
+  FOR EACH ROW EXECUTE FUNCTION bump_tag_version();
+
+DROP TRIGGER IF EXISTS tags_bump_version_rename ON tags;
+CREATE TRIGGER tags_bump_version_rename
+  AFTER UPDATE OF tag ON tags
+  FOR EACH ROW WHEN (OLD.tag IS DISTINCT FROM NEW.tag)
+  EXECUTE FUNCTION bump_tag_version();
+
+DROP TRIGGER IF EXISTS tags_bump_version_truncate ON tags;
+CREATE TRIGGER tags_bump_version_truncate
+  AFTER TRUNCATE ON tags
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_tag_version();
@@ -0,0 +1,24 @@
+-- ========================================
+-- TAG VERSION WITHOUT A ROW LOCK
+-- ========================================
+-- The triggers from 0005 UPDATE the single tag_version row, so every
+-- transaction that adds or removes a tag holds that row's lock until it
+-- commits, and posts that create new tags serialize across all workers.
+--
+-- Each change now appends a row instead; concurrent inserts never wait on
+-- each other. The version is the frozen tag_version.version plus the
+-- number of committed rows here (see tag_trie._TAG_VERSION_SQL), so it
+-- only moves when a change commits and continues from the old counter.
+-- A sequence would not do: nextval() is visible before the writer
+-- commits, so a reader could stamp a snapshot with a version whose
+-- change it cannot see yet.
+CREATE TABLE IF NOT EXISTS tag_changes (
+  id  BIGSERIAL PRIMARY KEY
+);
+
+CREATE OR REPLACE FUNCTION bump_tag_version() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO tag_changes DEFAULT VALUES;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,81 @@
+# backend/post_cache.py
+"""
+Bounded LRU cache of post objects keyed by postID, for /api/posts/by_ids.
+
+    found, missing, gen = post_cache.get_many([3, 1, 2])   # found: {id: post}
+    post_cache.put_many(posts_from_db, gen)
+    post_cache.invalidate(post_id)                         # after a delete commits
+
+Posts are immutable once created (there is no edit endpoint), so the only
+invalidation needed is on delete. put_many() drops its rows when a delete
+landed after the get_many() they answer, as they may hold the deleted
+post. Rows read from a replica are not cached within REPLICA_MAX_LAG of a
+delete, so a lagging replica cannot bring a deleted post back. Entries
+also expire after POST_CACHE_TTL seconds, which bounds how long a renamed
+author handle can be served.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from coherence import on_resync, subscribe
+from db import REPLICA_MAX_LAG
+
+POST_CACHE_SIZE = int(os.getenv("POST_CACHE_SIZE", "5000"))
+POST_CACHE_TTL = float(os.getenv("POST_CACHE_TTL", "300"))
+
+_lock = threading.Lock()
+_posts = OrderedDict()   # postID -> (post, cached_at), least recently used first
+_deleted_at = 0.0        # monotonic time of the last invalidate()
+_generation = 0          # bumped by every invalidate(), see put_many()
+
+
+def get_many(ids):
+    """
+    Return ({postID: post} for the cached ids, [ids that missed], generation);
+    pass the generation to put_many() with the rows read for the misses.
+    """
+    found, missing = {}, []
+    now = time.monotonic()
+    with _lock:
+        for pid in ids:
+            entry = _posts.get(pid)
+            if entry is None or now - entry[1] > POST_CACHE_TTL:
+                missing.append(pid)
+                continue
+            _posts.move_to_end(pid)
+            found[pid] = entry[0]
+        return found, missing, _generation
+
+
+def put_many(posts, generation, replica=False):
+    now = time.monotonic()
+    with _lock:
+        if generation != _generation:
+            # a post was deleted after get_many(); the rows may predate it
+            return
+        if replica and now - _deleted_at < REPLICA_MAX_LAG:
+            return
+        for p in posts:
+            _posts[p["postID"]] = (p, now)
+            _posts.move_to_end(p["postID"])
+        while len(_posts) > POST_CACHE_SIZE:
+            _posts.popitem(last=False)
+
+
+def invalidate(post_id=None):
+    """Drop one post, or everything when `post_id` is None."""
+    global _deleted_at, _generation
+    with _lock:
+        _generation += 1
+        _deleted_at = time.monotonic()
+        if post_id is None:
+            _posts.clear()
+        else:
+            _posts.pop(post_id, None)
+
+
+# another worker deleted a post (see posts.delete_post)
+subscribe("posts", lambda payload: invalidate(payload["postID"]) if payload.get("postID") else None)
+on_resync(invalidate)
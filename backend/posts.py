@@ -1,36 +1,53 @@
 # backend/posts.py
 from flask import Blueprint, jsonify, request
 import json
+import math
+import os
 
-from db import get_db
-from auth import requires_auth, current_user
+from db import get_db, get_read_db
+from auth import requires_auth, optional_auth, current_user
+from admission import concurrency_limit, rate_limit
 from users import auto_register_user
-from tag_trie import TAG_TRIE
+from tag_trie import TAG_TRIE, delete_orphan_tags, ensure_tag_trie, lock_tag
+from coherence import publish
+import bookmark_set
+import feed_cache
+import post_cache
 
 posts_bp = Blueprint("posts", __name__)
 
+# most IDs one /api/posts/by_ids call may ask for
+BY_IDS_MAX = int(os.getenv("BY_IDS_MAX", "200"))
+
 
 def _attach_tags_links_images(db, post_rows):
     """Helper to attach tags, links, images to post dicts."""
     posts = [dict(r) for r in post_rows]
+    if not posts:
+        return posts
+
+    # one query for every post's tags rather than one per post
+    placeholders = ",".join("?" for _ in posts)
+    trows = db.execute(
+        f"SELECT postID, tag FROM post_tags WHERE postID IN ({placeholders}) ORDER BY tag ASC",
+        [p["postID"] for p in posts],
+    ).fetchall()
+    tags_by_post = {}
+    for tr in trows:
+        tags_by_post.setdefault(tr["postid"], []).append(tr["tag"])
 
     for p in posts:
         # decode JSON columns
         p["links"] = json.loads(p.get("links") or "[]")
         p["images"] = json.loads(p.get("images") or "[]")
-
-        # attach tags from post_tags
-        trows = db.execute(
-            "SELECT tag FROM post_tags WHERE postID = ? ORDER BY tag ASC",
-            (p["postID"],),
-        ).fetchall()
-        p["tags"] = [tr["tag"] for tr in trows]
+        p["tags"] = tags_by_post.get(p["postID"], [])
 
     return posts
 
 
 @posts_bp.post("/posts")
 @requires_auth
+@rate_limit("posts", "10/60")
 def create_post():
     """
     Create a post.
@@ -62,7 +79,7 @@ def create_post():
     tags = []
     for t in raw_tags:
         t = (t or "").strip()
-        if t:
+        if t and t not in tags:
             tags.append(t)
 
     if not text:
@@ -75,7 +92,7 @@ def create_post():
         """
         INSERT INTO posts (author_sub, title, text, links, images)
         VALUES (?, ?, ?, ?, ?)
-        RETURNING postid
+        RETURNING postid, created_at
         """,
         (sub, title, text, links, images),
     ).fetchone()
@@ -91,11 +108,9 @@ def create_post():
 
     # Insert tags and junction rows (full paths only)
     for tag in tags:
-        # DB record of the full path
-        db.execute(
-            "INSERT INTO tags (tag) VALUES (?) ON CONFLICT(tag) DO NOTHING",
-            (tag,),
-        )
+        # DB record of the full path, locked so it can't be deleted as an
+        # orphan before our post_tags row lands
+        lock_tag(db, tag)
         db.execute(
             """
             INSERT INTO post_tags (postID, tag)
@@ -107,8 +122,27 @@ def create_post():
         # Also record in trie (backend data structure requirement)
         TAG_TRIE.insert(tag)
 
+    if tags:
+        # other workers reload their trie once this commits
+        publish(db, "tags")
+    publish(db, "posts", tags=tags)
     db.commit()
 
+    # same shape as a list_posts row, so hot feeds can take it as is
+    feed_cache.post_created(
+        {
+            "postID": post_id,
+            "author_sub": sub,
+            "title": title,
+            "text": text,
+            "links": json.loads(links),
+            "images": json.loads(images),
+            "created_at": row["created_at"],
+            "handle": user_row["handle"],
+            "tags": sorted(tags),
+        }
+    )
+
     return (
         jsonify(
             {
@@ -122,35 +156,30 @@ def create_post():
     )
 
 
-@posts_bp.get("/posts")
-def list_posts():
-    """
-    List posts, optionally filtered by a hierarchical tag.
-
-    Query param:
-      ?tag=CS
-        → returns posts whose tags are "CS" **or** start with "CS/"
-
-      ?tag=CS/CS315
-        → returns posts whose tags are "CS/CS315" **or** start with "CS/CS315/"
-    """
-    tag_filter = (request.args.get("tag") or "").strip()
-    db = get_db()
+def _query_feed(tag_filter, limit):
+    """Newest-first posts tagged `tag_filter` or below it (all posts for "")."""
+    db = get_read_db()
+    limit_sql = "LIMIT ?" if limit is not None else ""
+    limit_args = [limit] if limit is not None else []
 
     if tag_filter:
         # Find all full tags that match this path as prefix
+        # (escaped so "_" and "%" in a tag are not wildcards)
+        like = tag_filter.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
         trows = db.execute(
             """
             SELECT tag
             FROM tags
             WHERE tag = ?
-               OR tag LIKE ?
+               OR tag LIKE ? ESCAPE '\\'
             """,
-            (tag_filter, f"{tag_filter}/%"),
+            (tag_filter, f"{like}/%"),
         ).fetchall()
 
         full_tags = [tr["tag"] for tr in trows] or [tag_filter]
 
+        # EXISTS rather than a join: a post with several matching tags
+        # is still listed once
         placeholders = ",".join("?" for _ in full_tags)
         rows = db.execute(
             f"""
@@ -165,15 +194,18 @@ def list_posts():
                 u.handle
             FROM posts p
             JOIN users u   ON p.author_sub = u.sub
-            JOIN post_tags pt ON pt.postID = p.postid
-            WHERE pt.tag IN ({placeholders})
-            ORDER BY p.created_at DESC
+            WHERE EXISTS (
+                SELECT 1 FROM post_tags pt
+                WHERE pt.postID = p.postid AND pt.tag IN ({placeholders})
+            )
+            ORDER BY p.created_at DESC, p.postid DESC
+            {limit_sql}
             """,
-            full_tags,
+            full_tags + limit_args,
         ).fetchall()
     else:
         rows = db.execute(
-            """
+            f"""
             SELECT
                 p.postid      AS "postID",
                 p.author_sub,
@@ -185,11 +217,92 @@ def list_posts():
                 u.handle
             FROM posts p
             JOIN users u ON p.author_sub = u.sub
-            ORDER BY p.created_at DESC
-            """
+            ORDER BY p.created_at DESC, p.postid DESC
+            {limit_sql}
+            """,
+            limit_args,
         ).fetchall()
 
-    posts = _attach_tags_links_images(db, rows)
+    return _attach_tags_links_images(db, rows)
+
+
+def _feed_cost():
+    """Gate units for /api/posts: one per 100 posts asked for, 4 when unpaginated."""
+    limit = request.args.get("limit", "")
+    if not limit.isdigit():
+        return 1 if limit else 4   # a bad limit is a cheap 400
+    return max(1, math.ceil(int(limit) / 100))
+
+
+def _by_ids_cost():
+    """Gate units for /api/posts/by_ids: one per 50 IDs."""
+    if request.method == "POST":
+        ids = (request.get_json(silent=True) or {}).get("ids")
+        n = len(ids) if isinstance(ids, list) else 0
+    else:
+        n = (request.args.get("ids") or "").count(",") + 1
+    return max(1, math.ceil(n / 50))
+
+
+def _with_flags(posts):
+    """Add is_bookmarked to each post when the request carries a user token."""
+    user = current_user()
+    if not user:
+        return posts
+    return bookmark_set.flag_bookmarked(posts, user["sub"])
+
+
+@posts_bp.get("/posts")
+@concurrency_limit("feeds", 8, cost=_feed_cost)
+@optional_auth
+def list_posts():
+    """
+    List posts, optionally filtered by a hierarchical tag.
+
+    Query param:
+      ?tag=CS
+        → returns posts whose tags are "CS" **or** start with "CS/"
+
+      ?tag=CS/CS315
+        → returns posts whose tags are "CS/CS315" **or** start with "CS/CS315/"
+
+      ?tag=CS&facets=children
+        → {"posts": [...], "facets": {"children": [...]}} where children
+          are the tag's immediate subtags with counts (see /api/tags/children)
+
+      ?limit=20
+        → only the 20 newest posts
+
+    With an Authorization header each post also carries "is_bookmarked"
+    for that user (see bookmark_set.py).
+
+    Hot tags are answered from feed_cache without touching the DB.
+    """
+    tag_filter = (request.args.get("tag") or "").strip()
+    facets = [f.strip() for f in (request.args.get("facets") or "").split(",") if f.strip()]
+
+    limit = request.args.get("limit")
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            return jsonify({"error": "Invalid limit parameter"}), 400
+        if limit < 1:
+            return jsonify({"error": "Invalid limit parameter"}), 400
+
+    posts, generation = feed_cache.lookup(tag_filter, limit)
+    if posts is None:
+        posts = _query_feed(tag_filter, limit)
+        feed_cache.fill(tag_filter, posts, limit, generation, replica=get_read_db().replica)
+    posts = _with_flags(posts)
+
+    if facets:
+        out = {"posts": posts, "facets": {}}
+        if "children" in facets:
+            ensure_tag_trie()
+            out["facets"]["children"] = TAG_TRIE.children(tag_filter)
+        return jsonify(out), 200
+
     return jsonify(posts), 200
 
 
@@ -201,6 +314,7 @@ def delete_post(post_id):
       - Only author may delete
       - Removes postID from user's created_posts and bookmarks
       - post_tags rows are handled by FK ON DELETE CASCADE
+      - Tags left with no posts are deleted and pruned from TAG_TRIE
     """
     user = current_user()
     sub = user.get("sub")
@@ -244,61 +358,95 @@ def delete_post(post_id):
                 """,
                 (json.dumps(created), json.dumps(bookmarks), sub),
             )
+            publish(db, "bookmarks", sub=sub)
+
+    # Remember the post's tags before the cascade drops its post_tags rows
+    trows = db.execute(
+        "SELECT tag FROM post_tags WHERE postID = ?",
+        (post_id,),
+    ).fetchall()
+    post_tags = [tr["tag"] for tr in trows]
 
-    # Delete post
+    # Delete post, then any of its tags that are now unreferenced
     db.execute("DELETE FROM posts WHERE postid = ?", (post_id,))
+    orphaned = delete_orphan_tags(db, post_tags)
+    if post_tags:
+        publish(db, "tags")
+    publish(db, "posts", tags=post_tags, postID=post_id)
     db.commit()
 
+    feed_cache.post_deleted(post_id, post_tags)
+    post_cache.invalidate(post_id)
+    bookmark_set.bookmark_removed(sub, post_id)
+
+    # counts from memory, pruning from what the DB deleted
+    for tag in post_tags:
+        TAG_TRIE.release(tag)
+    for tag in orphaned:
+        TAG_TRIE.remove(tag)
+
     return jsonify({"deleted": post_id}), 200
 
 
 @posts_bp.get("/posts/by_ids")
+@posts_bp.post("/posts/by_ids")
+@concurrency_limit("by_ids", 4, cost=_by_ids_cost)
+@optional_auth
 def posts_by_ids():
     """
-    Bulk fetch posts by IDs.
-    GET /api/posts/by_ids?ids=1,2,3
+    Bulk fetch posts by IDs, in the order asked for:
+
+      GET  /api/posts/by_ids?ids=3,1,2
+      POST /api/posts/by_ids  {"ids": [3, 1, 2]}    (for long lists)
+
+    Duplicate IDs are returned once; IDs with no post are skipped. At most
+    BY_IDS_MAX distinct IDs per call. Posts are served from post_cache and
+    only the misses are read from the DB. With a user token, posts carry
+    "is_bookmarked" as in list_posts.
     """
-    ids_raw = (request.args.get("ids") or "").strip()
-    if not ids_raw:
-        return jsonify([]), 200
+    if request.method == "POST":
+        raw_ids = (request.get_json(silent=True) or {}).get("ids")
+        if not isinstance(raw_ids, list):
+            return jsonify({"error": "Body must be {\"ids\": [...]}"}), 400
+    else:
+        ids_raw = (request.args.get("ids") or "").strip()
+        raw_ids = [x for x in ids_raw.split(",") if x.strip()]
 
     try:
-        raw_ids = [int(x) for x in ids_raw.split(",") if x.strip()]
-    except ValueError:
+        raw_ids = [int(x) for x in raw_ids]
+    except (TypeError, ValueError):
         return jsonify({"error": "Invalid ids parameter"}), 400
 
     # dedupe while preserving order
-    seen = set()
-    ids = []
-    for i in raw_ids:
-        if i not in seen:
-            seen.add(i)
-            ids.append(i)
-
+    ids = list(dict.fromkeys(raw_ids))
+    if len(ids) > BY_IDS_MAX:
+        return jsonify({"error": f"At most {BY_IDS_MAX} ids per request"}), 400
     if not ids:
         return jsonify([]), 200
 
-    db = get_db()
-    placeholders = ",".join("?" for _ in ids)
-
-    rows = db.execute(
-        f"""
-        SELECT
-            p.postid      AS "postID",
-            p.author_sub,
-            p.title,
-            p.text,
-            p.links,
-            p.images,
-            p.created_at,
-            u.handle
-        FROM posts p
-        JOIN users u ON p.author_sub = u.sub
-        WHERE p.postid IN ({placeholders})
-        ORDER BY p.created_at DESC
-        """,
-        ids,
-    ).fetchall()
+    found, missing, generation = post_cache.get_many(ids)
+    if missing:
+        db = get_read_db()
+        placeholders = ",".join("?" for _ in missing)
+        rows = db.execute(
+            f"""
+            SELECT
+                p.postid      AS "postID",
+                p.author_sub,
+                p.title,
+                p.text,
+                p.links,
+                p.images,
+                p.created_at,
+                u.handle
+            FROM posts p
+            JOIN users u ON p.author_sub = u.sub
+            WHERE p.postid IN ({placeholders})
+            """,
+            missing,
+        ).fetchall()
+        fetched = _attach_tags_links_images(db, rows)
+        post_cache.put_many(fetched, generation, replica=db.replica)
+        found.update((p["postID"], p) for p in fetched)
 
-    posts = _attach_tags_links_images(db, rows)
-    return jsonify(posts), 200
+    return jsonify(_with_flags([found[i] for i in ids if i in found])), 200
@@ -0,0 +1,194 @@
+# backend/profiler.py
+"""
+On-demand sampling profiler for a running worker.
+
+Off unless PROFILER_TOKEN is set; every call must then send it as the
+X-Profile-Token header. Two ways to use it:
+
+    # what is this worker doing? sample every thread for 10 s
+    curl -H "X-Profile-Token: $T" "http://host/api/debug/profile?seconds=10" > out.folded
+
+    # why is this request slow? profile just the thread serving it
+    curl -i -H "X-Profile-Token: $T" -H "X-Profile: 1" "http://host/api/posts?tag=CS"
+    #   → X-Profile-Id: 3f9a...
+    curl -H "X-Profile-Token: $T" "http://host/api/debug/profile/3f9a..." > req.folded
+
+Output is in the "collapsed stack" format, one line per distinct stack
+with its sample count, e.g.
+
+    ThreadPoolExecutor-0_0;...;posts:list_posts;posts:_attach_tags_links_images;db:PGDatabase.execute 12
+
+so it can go straight into flamegraph.pl or speedscope. Frames are named
+module:qualified name (cuckoo_map:CuckooHashMap.__setitem__,
+tag_trie:TagTrie.children, auth:_verify).
+
+A sampler thread reads sys._current_frames() every interval; nothing is
+traced between samples, so the profiled code runs at full speed. Threads
+parked waiting for work are left out unless ?idle=1.
+"""
+import hmac
+import os
+import sys
+import threading
+import uuid
+from collections import Counter, OrderedDict
+
+from flask import Blueprint, Response, g, jsonify, request
+
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN", "")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# finer for one request, which may only last a few ms; while that thread
+# holds the GIL the sampler still only gets in every sys.getswitchinterval()
+PROFILE_REQUEST_INTERVAL_MS = float(os.getenv("PROFILE_REQUEST_INTERVAL_MS", "1"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_KEEP = 32   # per-request profiles kept for fetching
+
+profiler_bp = Blueprint("profiler", __name__)
+
+# innermost frames of a thread that is waiting for work, not doing any
+_IDLE_LEAVES = {
+    "threading:Condition.wait",
+    "threading:Event.wait",
+    "threading:Thread.join",
+    "queue:Queue.get",
+    "selectors:EpollSelector.select",
+    "selectors:PollSelector.select",
+    "selectors:SelectSelector.select",
+    "concurrent.futures.thread:_worker",
+    "socketserver:BaseServer.serve_forever",
+}
+
+_timed_lock = threading.Lock()        # one whole-worker profile at a time
+_results_lock = threading.Lock()
+_results = OrderedDict()              # profile id -> collapsed text
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)   # co_qualname: 3.11+
+    return f"{frame.f_globals.get('__name__', '?')}:{name}"
+
+
+class Sampler(threading.Thread):
+    """Counts the stacks of `threads` (idents; None for all) every `interval` seconds."""
+
+    def __init__(self, interval, threads=None, exclude=(), idle=False):
+        super().__init__(name="profiler", daemon=True)
+        self.interval = interval
+        self.threads = threads
+        self.exclude = set(exclude)
+        self.idle = idle
+        self.stacks = Counter()
+        self.samples = 0
+        self._done = threading.Event()
+
+    def run(self):
+        self.exclude.add(threading.get_ident())
+        labels = {}   # code object -> label, so each frame is named once
+        names = {}
+        while not self._done.wait(self.interval):
+            frames = sys._current_frames()
+            if any(ident not in names for ident in frames):
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in frames.items():
+                if ident in self.exclude or (self.threads is not None and ident not in self.threads):
+                    continue
+                stack = []
+                while frame is not None:
+                    label = labels.get(frame.f_code)
+                    if label is None:
+                        label = labels[frame.f_code] = _frame_label(frame)
+                    stack.append(label)
+                    frame = frame.f_back
+                if not self.idle and stack and stack[0] in _IDLE_LEAVES:
+                    continue
+                stack.append(names.get(ident, f"thread-{ident}"))
+                stack.reverse()
+                self.stacks[";".join(stack)] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return self
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+def _authorized() -> bool:
+    sent = request.headers.get("X-Profile-Token", "")
+    return bool(PROFILER_TOKEN) and hmac.compare_digest(sent.encode(), PROFILER_TOKEN.encode())
+
+
+def _folded(sampler) -> Response:
+    resp = Response(sampler.collapsed(), mimetype="text/plain")
+    resp.headers["X-Profile-Samples"] = str(sampler.samples)
+    return resp
+
+
+@profiler_bp.get("/debug/profile")
+def profile_worker():
+    """
+    Sample every thread of this worker for ?seconds= (default 10), every
+    ?interval_ms= (default PROFILE_INTERVAL_MS). Blocks for that long.
+    """
+    if not _authorized():
+        return jsonify({"error": "Not found"}), 404
+    try:
+        seconds = float(request.args.get("seconds", "10"))
+        interval = float(request.args.get("interval_ms", PROFILE_INTERVAL_MS)) / 1000
+    except ValueError:
+        return jsonify({"error": "Invalid seconds or interval_ms"}), 400
+    if not 0 < seconds <= PROFILE_MAX_SECONDS or not 0 < interval <= 1:
+        return jsonify({"error": f"seconds must be in (0, {PROFILE_MAX_SECONDS:g}]"}), 400
+
+    if not _timed_lock.acquire(blocking=False):
+        return jsonify({"error": "A profile is already running"}), 409
+    try:
+        sampler = Sampler(interval, exclude={threading.get_ident()}, idle=request.args.get("idle") == "1")
+        sampler.start()
+        threading.Event().wait(seconds)
+        return _folded(sampler.stop())
+    finally:
+        _timed_lock.release()
+
+
+@profiler_bp.get("/debug/profile/<profile_id>")
+def get_request_profile(profile_id):
+    """The collapsed stacks of a request profiled with X-Profile: 1."""
+    if not _authorized():
+        return jsonify({"error": "Not found"}), 404
+    with _results_lock:
+        text = _results.get(profile_id)
+    if text is None:
+        return jsonify({"error": "Unknown or expired profile id"}), 404
+    return Response(text, mimetype="text/plain")
+
+
+def _before():
+    if request.headers.get("X-Profile") == "1" and _authorized():
+        g._profiler = Sampler(PROFILE_REQUEST_INTERVAL_MS / 1000, threads={threading.get_ident()}, idle=True)
+        g._profiler.start()
+
+
+def _after(resp):
+    sampler = g.pop("_profiler", None)
+    if sampler is None:
+        return resp
+    profile_id = uuid.uuid4().hex
+    text = sampler.stop().collapsed()
+    with _results_lock:
+        _results[profile_id] = text
+        while len(_results) > PROFILE_KEEP:
+            _results.popitem(last=False)
+    resp.headers["X-Profile-Id"] = profile_id
+    resp.headers["X-Profile-Samples"] = str(sampler.samples)
+    return resp
+
+
+def init_profiler(app):
+    """Install the per-request hook (only when PROFILER_TOKEN is set)."""
+    if PROFILER_TOKEN:
+        app.before_request(_before)
+        app.after_request(_after)
@@ -1,10 +1,14 @@
 # backend/recent.py
 from flask import Blueprint, request, jsonify
+import threading
 import time
 from typing import Dict
 import json
 from db import get_db
-from cuckoo_map import CuckooHashMap  # advanced hashing structure
+from admission import rate_limit
+from cuckoo_map import ConcurrentCuckooHashMap  # advanced hashing structure
+from coherence import SHARED_STATE, publish, subscribe, on_resync
+from trending import TRENDING
 # no circular import: do NOT import users here
 
 recent_bp = Blueprint("recent", __name__)
@@ -18,22 +22,28 @@ class _PerUserRecents:
 
     We keep at most _RECENT_MAX entries per user. Recents are returned
     most-recent-first by sorting on the stored timestamps.
+
+    Safe under threaded workers: puts for one user are serialized (insert
+    + trim must not interleave), list() reads without locking.
     """
 
     def __init__(self):
-        self.map = CuckooHashMap()  # tag -> ts (time_ns)
+        self.map = ConcurrentCuckooHashMap()  # tag -> ts (time_ns)
+        self.version = 0            # recent_topics.version we loaded (SHARED_STATE)
+        self.lock = threading.Lock()
 
     def put(self, tag: str):
         if not tag:
             return
 
-        ts = time.time_ns()
-        self.map[tag] = ts
+        with self.lock:
+            ts = time.time_ns()
+            self.map[tag] = ts
 
-        # Trim to at most _RECENT_MAX entries
-        while len(self.map) > _RECENT_MAX:
-            oldest_tag, _ = min(self.map.items(), key=lambda kv: kv[1])
-            del self.map[oldest_tag]
+            # Trim to at most _RECENT_MAX entries
+            while len(self.map) > _RECENT_MAX:
+                oldest_tag, _ = min(self.map.items(), key=lambda kv: kv[1])
+                del self.map[oldest_tag]
 
     def list(self):
         sorted_items = sorted(self.map.items(), key=lambda kv: kv[1], reverse=True)
@@ -42,13 +52,60 @@ class _PerUserRecents:
 
 # In-memory: userKey -> _PerUserRecents
 _USERS: Dict[str, _PerUserRecents] = {}
+_USERS_LOCK = threading.Lock()
+_HYDRATING: Dict[str, threading.Event] = {}  # userKey -> set when its hydration ends
+
+
+def _drop_bucket(payload):
+    # another worker wrote this user's recents; reload on next access
+    _USERS.pop(payload.get("user"), None)
+
+
+subscribe("recents", _drop_bucket)
+on_resync(_USERS.clear)
+
+
+def _seed(bucket: _PerUserRecents, topics) -> None:
+    # Assign decreasing timestamps so leftmost is "most recent"
+    base_ts = time.time_ns()
+    for idx, tag in enumerate(topics):
+        if not tag:
+            continue
+        bucket.map[tag] = base_ts - idx
+
+
+def _hydrate_shared(user_key: str, bucket: _PerUserRecents) -> bool:
+    """
+    Seed from the recent_topics table shared by all workers.
+    Returns False if this user has no row yet.
+    """
+    db = get_db()
+    row = db.execute(
+        "SELECT topics, version FROM recent_topics WHERE user_key = ?",
+        (user_key,),
+    ).fetchone()
+    if not row:
+        return False
+
+    bucket.version = row["version"]
+    try:
+        _seed(bucket, json.loads(row["topics"] or "[]"))
+    except json.JSONDecodeError:
+        pass
+    return True
 
 
 def _hydrate_from_db(user_key: str, bucket: _PerUserRecents) -> None:
     """
     On first use for an Auth0 user, seed the in-memory recents
     from the users.recent_history column if it exists.
+
+    With SHARED_STATE the recent_topics table (written on every
+    recent_add) takes precedence, for guests too.
     """
+    if SHARED_STATE and _hydrate_shared(user_key, bucket):
+        return
+
     # Only try for real Auth0 users; guests never hit the users table
     if not user_key.startswith("auth0|"):
         return
@@ -71,21 +128,84 @@ def _hydrate_from_db(user_key: str, bucket: _PerUserRecents) -> None:
     except json.JSONDecodeError:
         return
 
-    # Assign decreasing timestamps so leftmost is "most recent"
-    base_ts = time.time_ns()
-    for idx, tag in enumerate(topics):
-        if not tag:
-            continue
-        bucket.map[tag] = base_ts - idx
+    _seed(bucket, topics)
 
 
 def _get_bucket(user_key: str) -> _PerUserRecents:
-    bucket = _USERS.get(user_key)
-    if bucket is None:
-        bucket = _PerUserRecents()
-        _USERS[user_key] = bucket
-        _hydrate_from_db(user_key, bucket)
-    return bucket
+    """
+    Return the user's bucket, hydrating it from the DB on first use.
+    Single-flight: when several threads miss at once, one hydrates and
+    the rest wait for it instead of each querying the DB. The bucket is
+    only published in _USERS once it is fully loaded.
+    """
+    while True:
+        bucket = _USERS.get(user_key)
+        if bucket is not None:
+            return bucket
+
+        with _USERS_LOCK:
+            bucket = _USERS.get(user_key)
+            if bucket is not None:
+                return bucket
+            done = _HYDRATING.get(user_key)
+            owner = done is None
+            if owner:
+                done = _HYDRATING[user_key] = threading.Event()
+
+        if not owner:
+            # loop: if the owner's hydration failed we become the owner
+            done.wait()
+            continue
+
+        try:
+            bucket = _PerUserRecents()
+            _hydrate_from_db(user_key, bucket)
+            with _USERS_LOCK:
+                _USERS[user_key] = bucket
+            return bucket
+        finally:
+            with _USERS_LOCK:
+                del _HYDRATING[user_key]
+            done.set()
+
+
+def _persist_shared(user_key: str, bucket: _PerUserRecents) -> bool:
+    """
+    Write the bucket to recent_topics and tell the other workers to drop
+    their copy. The write only succeeds if the row is still at the version
+    we loaded; returns False if another worker got there first.
+    """
+    db = get_db()
+    topics = json.dumps(bucket.list())
+    if bucket.version == 0:
+        row = db.execute(
+            """
+            INSERT INTO recent_topics (user_key, topics, version)
+            VALUES (?, ?, 1)
+            ON CONFLICT (user_key) DO NOTHING
+            RETURNING version
+            """,
+            (user_key, topics),
+        ).fetchone()
+    else:
+        row = db.execute(
+            """
+            UPDATE recent_topics
+            SET topics = ?, version = version + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE user_key = ? AND version = ?
+            RETURNING version
+            """,
+            (topics, user_key, bucket.version),
+        ).fetchone()
+
+    if row is None:
+        db.rollback()
+        return False
+
+    bucket.version = row["version"]
+    publish(db, "recents", user=user_key)
+    db.commit()
+    return True
 
 
 @recent_bp.get("/recent-topics")
@@ -97,7 +217,15 @@ def recent_list():
     return jsonify({"ok": True, "topics": bucket.list()}), 200
 
 
+def _body_user_key():
+    return "user:" + str((request.get_json(silent=True) or {}).get("user") or "")
+
+
+# "user" is whatever the client sends, so also cap each client IP (loosely,
+# as a campus network may put many students behind one address)
 @recent_bp.post("/recent-topics")
+@rate_limit("recents_ip", "600/60", key=lambda: request.remote_addr)
+@rate_limit("recents", "60/60", key=_body_user_key)
 def recent_add():
     data = request.get_json(silent=True) or {}
     user_key = (data.get("user") or "").strip()
@@ -105,11 +233,26 @@ def recent_add():
     if not user_key or not tag:
         return jsonify({"ok": False, "error": "Missing user or tag"}), 400
     bucket = _get_bucket(user_key)
+    # reloading the page you are already on is not another vote
+    if bucket.list()[:1] != [tag]:
+        TRENDING.record(tag)
     bucket.put(tag)
+
+    if SHARED_STATE:
+        for _ in range(3):
+            if _persist_shared(user_key, bucket):
+                break
+            # lost the race: reload the other worker's list and re-apply ours
+            _USERS.pop(user_key, None)
+            bucket = _get_bucket(user_key)
+            bucket.put(tag)
+
     return jsonify({"ok": True, "topics": bucket.list()}), 200
 
 
 @recent_bp.post("/recent-topics/save")
+@rate_limit("recents_ip", "600/60", key=lambda: request.remote_addr)
+@rate_limit("recents", "60/60", key=_body_user_key)
 def save_recents():
     data = request.get_json(silent=True) or {}
     user_key = (data.get("user") or "").strip()
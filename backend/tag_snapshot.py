@@ -0,0 +1,303 @@
+# backend/tag_snapshot.py
+"""
+Binary snapshots of TAG_TRIE for fast warm starts.
+
+Rebuilding the trie means reading every tag from the DB and splitting
+each path again. A snapshot stores the built trie instead, as flat arrays
+that can be memory-mapped and queried directly:
+
+    write_snapshot(trie, db_version, path)   # after a rebuild from the DB
+    flat = load_snapshot(path)               # mmap; no per-node objects
+    flat.children("CS")                      # same answers as TagTrie
+
+Because the file is mapped read-only, every worker on the machine shares
+the same page-cache pages. Each snapshot is stamped with the
+tag version it was built from (migrations 0003, 0005 and 0006), and is
+only used while the DB is still at that version. The version tracks the
+set of tags, not post counts, so tag_trie also skips snapshots older than
+TAG_SNAPSHOT_MAX_AGE.
+
+Layout (little-endian, every section padded to 8 bytes):
+
+    header      magic, db_version, created_at, n_segments, n_nodes, blob_len
+    node_refs       int64[n_nodes]     posts tagged with exactly this path
+    node_subtree    int64[n_nodes]     refs over the node and its descendants
+    seg_offsets     uint32[n_segments + 1]
+    node_seg        uint32[n_nodes]    index into the segment table
+    node_first      uint32[n_nodes]    index of the first child
+    node_nchild     uint32[n_nodes]
+    node_is_tag     uint8[n_nodes]
+    seg_blob        UTF-8 segment names, interned (each distinct name once)
+
+Nodes are laid out breadth-first, so a node's children are contiguous,
+sorted the way TagTrie.children() lists them (case-insensitively). Node 0
+is the root.
+"""
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"TAGSNAP1"
+_HEADER = struct.Struct("<8sqqIII4x")
+
+
+def _pad(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _sort_key(seg: str):
+    return (seg.lower(), seg)
+
+
+def _segments(tag_path: str):
+    # imported here: tag_trie imports this module
+    from tag_trie import TagTrie
+
+    return TagTrie._segments(tag_path)
+
+
+def write_snapshot(trie, db_version: int, path: str) -> int:
+    """
+    Write `trie` (a TagTrie) to `path`, stamped with `db_version`.
+    The file is written next to `path` and renamed over it, so workers
+    that already mapped the old file keep a consistent copy.
+    Returns the number of bytes written.
+    """
+    seg_ids = {"": 0}
+    segments = [""]
+    node_seg, node_first, node_nchild, node_is_tag = [], [], [], []
+    node_refs, node_subtree = [], []
+
+    queue = [trie.root]
+    i = 0
+    while i < len(queue):
+        node = queue[i]
+        i += 1
+        sid = seg_ids.get(node.name)
+        if sid is None:
+            sid = seg_ids[node.name] = len(segments)
+            segments.append(node.name)
+        kids = sorted(node.children.values(), key=lambda c: _sort_key(c.name))
+        node_seg.append(sid)
+        node_first.append(len(queue))
+        node_nchild.append(len(kids))
+        node_is_tag.append(1 if node.is_tag else 0)
+        node_refs.append(node.refs)
+        node_subtree.append(node.subtree_refs)
+        queue.extend(kids)
+
+    encoded = [s.encode("utf-8") for s in segments]
+    offsets = [0]
+    for b in encoded:
+        offsets.append(offsets[-1] + len(b))
+    blob = b"".join(encoded)
+    n = len(queue)
+
+    def section(fmt, values):
+        raw = struct.pack(f"<{len(values)}{fmt}", *values)
+        return raw + b"\0" * (_pad(len(raw)) - len(raw))
+
+    body = b"".join(
+        [
+            _HEADER.pack(MAGIC, db_version, time.time_ns(), len(segments), n, len(blob)),
+            section("q", node_refs),
+            section("q", node_subtree),
+            section("I", offsets),
+            section("I", node_seg),
+            section("I", node_first),
+            section("I", node_nchild),
+            section("B", node_is_tag),
+            blob,
+        ]
+    )
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return len(body)
+
+
+def read_version(path: str):
+    """The db_version stamped in the snapshot at `path`, or None if there is none."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(_HEADER.size)
+    except OSError:
+        return None
+    if len(head) < _HEADER.size or head[:8] != MAGIC:
+        return None
+    return _HEADER.unpack(head)[1]
+
+
+def load_snapshot(path: str):
+    """
+    Map the snapshot at `path` and return a FlatTagTrie, or None if the
+    file is missing or unreadable (the caller then rebuilds from the DB).
+    """
+    if sys.byteorder != "little":
+        # the arrays are read with native memoryview casts
+        return None
+    try:
+        with open(path, "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        return FlatTagTrie(buf)
+    except ValueError as e:
+        log.warning("ignoring tag snapshot %s: %s", path, e)
+        return None
+
+
+class FlatTagTrie:
+    """
+    Read-only TagTrie over a mapped snapshot. Answers children(),
+    tags_under(), has_path() and to_nested_dict() exactly like TagTrie;
+    to_root() builds ordinary TagNodes when the trie has to change.
+    """
+
+    def __init__(self, buf):
+        if len(buf) < _HEADER.size:
+            raise ValueError("truncated header")
+        magic, self.db_version, self.created_at, n_segs, n_nodes, blob_len = _HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            raise ValueError("bad magic")
+
+        view = memoryview(buf)
+        pos = _HEADER.size
+
+        def take(fmt, count, width):
+            nonlocal pos
+            end = pos + count * width
+            if end > len(buf):
+                raise ValueError("truncated snapshot")
+            arr = view[pos:end].cast(fmt)
+            pos = _pad(end)
+            return arr
+
+        self._buf = buf
+        self._refs = take("q", n_nodes, 8)
+        self._subtree = take("q", n_nodes, 8)
+        self._seg_offsets = take("I", n_segs + 1, 4)
+        self._seg = take("I", n_nodes, 4)
+        self._first = take("I", n_nodes, 4)
+        self._nchild = take("I", n_nodes, 4)
+        self._is_tag = take("B", n_nodes, 1)
+        if pos + blob_len > len(buf):
+            raise ValueError("truncated segment table")
+        self._blob = view[pos:pos + blob_len]
+        self._names = {}  # segment id -> str, decoded on first use
+        self.n_nodes = n_nodes
+
+    # ---- helpers ----
+    def _name(self, node: int) -> str:
+        sid = self._seg[node]
+        name = self._names.get(sid)
+        if name is None:
+            start, end = self._seg_offsets[sid], self._seg_offsets[sid + 1]
+            name = self._names[sid] = str(self._blob[start:end], "utf-8")
+        return name
+
+    def _child(self, node: int, seg: str):
+        """Binary search `node`'s children for `seg`; returns a node index or None."""
+        key = _sort_key(seg)
+        lo = self._first[node]
+        hi = lo + self._nchild[node]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _sort_key(self._name(mid)) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._first[node] + self._nchild[node] and self._name(lo) == seg:
+            return lo
+        return None
+
+    def _find(self, segments):
+        node = 0
+        for seg in segments:
+            node = self._child(node, seg)
+            if node is None:
+                return None
+        return node
+
+    def _kids(self, node: int):
+        first = self._first[node]
+        return range(first, first + self._nchild[node])
+
+    # ---- TagTrie read API ----
+    def children(self, tag_path: str = ""):
+        segments = _segments(tag_path)
+        node = self._find(segments)
+        if node is None:
+            return []
+
+        prefix = "/".join(segments)
+        out = []
+        for child in self._kids(node):
+            count = self._subtree[child]
+            if count <= 0:
+                continue
+            seg = self._name(child)
+            out.append(
+                {
+                    "label": seg,
+                    "fullPath": f"{prefix}/{seg}" if prefix else seg,
+                    "isLeaf": not any(self._subtree[c] > 0 for c in self._kids(child)),
+                    "count": count,
+                }
+            )
+        return out
+
+    def tags_under(self, tag_path: str):
+        segments = _segments(tag_path)
+        node = self._find(segments) if segments else None
+        if node is None:
+            return []
+
+        out = []
+        stack = [("/".join(segments), node)]
+        while stack:
+            prefix, n = stack.pop()
+            if self._is_tag[n]:
+                out.append(prefix)
+            for c in self._kids(n):
+                stack.append((f"{prefix}/{self._name(c)}", c))
+        return out
+
+    def has_path(self, tag_path: str) -> bool:
+        segments = _segments(tag_path)
+        if not segments:
+            return False
+        node = self._find(segments)
+        return node is not None and bool(self._is_tag[node])
+
+    def to_nested_dict(self):
+        def build(node):
+            return {self._name(c): build(c) for c in self._kids(node)}
+
+        return build(0)
+
+    def to_root(self):
+        """Materialize the snapshot as a TagNode tree (for a trie that must change)."""
+        from tag_trie import TagNode
+
+        nodes = [TagNode()] * self.n_nodes
+        nodes[0] = root = TagNode()
+        for i in range(self.n_nodes):
+            node = nodes[i]
+            node.is_tag = bool(self._is_tag[i])
+            node.refs = self._refs[i]
+            node.subtree_refs = self._subtree[i]
+            for c in self._kids(i):
+                child = nodes[c] = TagNode(self._name(c))
+                node.children[child.name] = child
+        return root
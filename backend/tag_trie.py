@@ -1,7 +1,23 @@
 # backend/tag_trie.py
 
+import logging
+import os
+import threading
+import time
 from collections import defaultdict
 from db import get_db
+from coherence import publish, subscribe, on_listen, on_resync
+from tag_snapshot import load_snapshot, write_snapshot
+
+# Binary snapshot of the trie (see tag_snapshot.py); unset disables snapshots.
+TAG_SNAPSHOT_PATH = os.getenv("TAG_SNAPSHOT_PATH", "")
+# minimum seconds between snapshot writes after DB rebuilds
+TAG_SNAPSHOT_INTERVAL = float(os.getenv("TAG_SNAPSHOT_INTERVAL", "300"))
+# tag_version only tracks the set of tags, not post counts (migration
+# 0005), so older snapshots are rebuilt to keep their counts from drifting
+TAG_SNAPSHOT_MAX_AGE = float(os.getenv("TAG_SNAPSHOT_MAX_AGE", "3600"))
+
+log = logging.getLogger(__name__)
 
 
 class TagNode:
@@ -13,6 +29,8 @@ class TagNode:
         self.name = name              # segment name, e.g. "CS315"
         self.children = {}            # segment -> TagNode
         self.is_tag = False           # True if this node corresponds to a full tag path
+        self.refs = 0                 # number of posts tagged with exactly this path
+        self.subtree_refs = 0         # refs summed over this node and all descendants
 
 
 class TagTrie:
@@ -21,32 +39,125 @@ class TagTrie:
 
     The DB still only stores flat tag strings (full paths like "CS/CS315/Lab").
     We interpret "/" as hierarchy when building the trie.
+
+    After a warm start the trie may be backed by a read-only snapshot
+    (`_frozen`, a FlatTagTrie). Reads go straight to the snapshot; the
+    first change turns it into ordinary TagNodes.
     """
     def __init__(self):
         self.root = TagNode()
+        self._frozen = None
+        self._thaw_lock = threading.Lock()
 
     def clear(self):
         self.root = TagNode()
+        self._frozen = None
+
+    def install(self, root=None, frozen=None):
+        """Swap in a freshly built tree (`root`) or a mapped snapshot (`frozen`)."""
+        if frozen is not None:
+            self._frozen = frozen
+        else:
+            self.root = root
+            self._frozen = None
+
+    def _thaw(self):
+        with self._thaw_lock:
+            frozen = self._frozen
+            if frozen is not None:
+                self.root = frozen.to_root()
+                self._frozen = None
+
+    @staticmethod
+    def _segments(tag_path: str):
+        """Split "CS/CS315/Lab" into ["CS", "CS315", "Lab"], dropping empty segments."""
+        tag_path = (tag_path or "").strip()
+        if not tag_path:
+            return []
+        return [seg.strip() for seg in tag_path.split("/") if seg.strip()]
 
-    def insert(self, tag_path: str) -> bool:
+    def insert(self, tag_path: str, refs: int = 1) -> bool:
         """
         Insert a tag like "CS/CS315/Lab" into the trie.
         If there is no '/', it's just a top-level tag, e.g. "General".
-        """
-        tag_path = (tag_path or "").strip()
-        if not tag_path:
-            return False
 
-        segments = [seg.strip() for seg in tag_path.split("/") if seg.strip()]
+        `refs` is how many posts reference the tag; create_post passes the
+        default of 1 per post, the DB rebuild passes the real count.
+        """
+        segments = self._segments(tag_path)
         if not segments:
             return False
 
+        self._thaw()
         curr = self.root
+        curr.subtree_refs += refs
         for seg in segments:
             if seg not in curr.children:
                 curr.children[seg] = TagNode(seg)
             curr = curr.children[seg]
+            curr.subtree_refs += refs
         curr.is_tag = True
+        curr.refs += refs
+        return True
+
+    def _walk(self, segments):
+        """Return the list of nodes from the root down to the path, or None if missing."""
+        path = [self.root]
+        curr = self.root
+        for seg in segments:
+            curr = curr.children.get(seg)
+            if curr is None:
+                return None
+            path.append(curr)
+        return path
+
+    def _prune(self, path, segments):
+        """Drop nodes along `path` (deepest first) that no longer hold a tag or children."""
+        for depth in range(len(segments), 0, -1):
+            node = path[depth]
+            if node.is_tag or node.children:
+                break
+            del path[depth - 1].children[segments[depth - 1]]
+
+    def release(self, tag_path: str, refs: int = 1) -> bool:
+        """
+        Drop `refs` post references from a tag. The tag stays in the trie
+        even at zero (children() already hides it): the in-memory counts can
+        drift from the DB after a rebuild or another worker's writes, so
+        only the DB decides when a tag is gone, via remove().
+
+        Returns True if the tag was found.
+        """
+        self._thaw()
+        segments = self._segments(tag_path)
+        path = self._walk(segments) if segments else None
+        if path is None or not path[-1].is_tag:
+            return False
+
+        node = path[-1]
+        dropped = min(refs, node.refs)
+        node.refs -= dropped
+        for n in path:
+            n.subtree_refs -= dropped
+        return True
+
+    def remove(self, tag_path: str) -> bool:
+        """
+        Remove a tag regardless of its reference count (used when the DB
+        has dropped the tag), pruning empty ancestors.
+        """
+        self._thaw()
+        segments = self._segments(tag_path)
+        path = self._walk(segments) if segments else None
+        if path is None or not path[-1].is_tag:
+            return False
+
+        dropped = path[-1].refs
+        for n in path:
+            n.subtree_refs -= dropped
+        path[-1].is_tag = False
+        path[-1].refs = 0
+        self._prune(path, segments)
         return True
 
     def _to_dict_recursive(self, node: TagNode):
@@ -68,15 +179,78 @@ class TagTrie:
 
     def to_nested_dict(self):
         """Return a nested dict representing the entire tag tree (excluding the root)."""
+        frozen = self._frozen
+        if frozen is not None:
+            return frozen.to_nested_dict()
         return self._to_dict_recursive(self.root)
 
+    def children(self, tag_path: str = ""):
+        """
+        Immediate subtags of `tag_path` (top-level tags for ""), for topic
+        page chips:
+
+            [{"label": "CS315", "fullPath": "CS/CS315", "isLeaf": False, "count": 12}, ...]
+
+        `count` is the number of post tags in the child's subtree (a post
+        tagged twice under the child counts twice). Children without any
+        posts are left out. Returns [] if the path is not in the trie.
+        """
+        frozen = self._frozen
+        if frozen is not None:
+            return frozen.children(tag_path)
+        segments = self._segments(tag_path)
+        path = self._walk(segments)
+        if path is None:
+            return []
+
+        prefix = "/".join(segments)
+        out = []
+        for seg, child in sorted(path[-1].children.items(), key=lambda kv: kv[0].lower()):
+            if child.subtree_refs <= 0:
+                continue
+            out.append(
+                {
+                    "label": seg,
+                    "fullPath": f"{prefix}/{seg}" if prefix else seg,
+                    "isLeaf": not any(c.subtree_refs > 0 for c in child.children.values()),
+                    "count": child.subtree_refs,
+                }
+            )
+        return out
+
+    def tags_under(self, tag_path: str):
+        """
+        All full tags equal to or below `tag_path`, e.g. "CS/CS315" →
+        ["CS/CS315", "CS/CS315/Lab", ...]. The in-memory equivalent of
+        `tag = ? OR tag LIKE '?/%'`.
+        """
+        frozen = self._frozen
+        if frozen is not None:
+            return frozen.tags_under(tag_path)
+        segments = self._segments(tag_path)
+        path = self._walk(segments) if segments else None
+        if path is None:
+            return []
+
+        out = []
+        stack = [("/".join(segments), path[-1])]
+        while stack:
+            prefix, node = stack.pop()
+            if node.is_tag:
+                out.append(prefix)
+            for seg, child in node.children.items():
+                stack.append((f"{prefix}/{seg}", child))
+        return out
+
     def has_path(self, tag_path: str) -> bool:
         """Return True if a full tag path exists in the trie."""
-        tag_path = (tag_path or "").strip()
-        if not tag_path:
+        frozen = self._frozen
+        if frozen is not None:
+            return frozen.has_path(tag_path)
+        segments = self._segments(tag_path)
+        if not segments:
             return False
 
-        segments = [seg.strip() for seg in tag_path.split("/") if seg.strip()]
         curr = self.root
         for seg in segments:
             if seg not in curr.children:
@@ -88,15 +262,220 @@ class TagTrie:
 # Single global trie instance used by the app
 TAG_TRIE = TagTrie()
 
+# True until the trie has been loaded from the DB, and again whenever
+# another worker announces a tag change (see coherence.py).
+_trie_stale = True
+# tag_version the loaded trie was built from (None until loaded)
+_trie_version = None
+
+# the counter frozen by migration 0006 plus the changes committed since
+_TAG_VERSION_SQL = """
+    SELECT (SELECT version FROM tag_version WHERE id = 1)
+         + (SELECT COUNT(*) FROM tag_changes) AS version
+"""
+
 
-def rebuild_tag_trie_from_db():
+def invalidate_tag_trie(payload=None):
+    """Mark TAG_TRIE out of date; the next ensure_tag_trie() reloads it."""
+    global _trie_stale
+    _trie_stale = True
+
+
+def _check_tag_version(cur):
+    """
+    coherence.on_listen hook: a tag change committed after the trie was
+    loaded but before LISTEN took effect (e.g. between a fork and the
+    worker's first LISTEN) was never announced, so compare versions.
+    """
+    cur.execute(_TAG_VERSION_SQL)
+    if _trie_version is not None and cur.fetchone()[0] != _trie_version:
+        invalidate_tag_trie()
+
+
+subscribe("tags", invalidate_tag_trie)
+on_resync(invalidate_tag_trie)
+on_listen(_check_tag_version)
+
+
+def ensure_tag_trie():
+    """
+    Load TAG_TRIE if it has never been loaded or was invalidated. A cold
+    start may use the snapshot when it matches the DB's tag version; after
+    an invalidation the trie is always rebuilt from the DB, since the
+    snapshot's post counts predate the posts that caused it.
+    """
+    if not _trie_stale:
+        return
+    if _trie_version is None and load_tag_trie_snapshot():
+        return
+    rebuild_tag_trie_from_db()
+
+
+def _tag_version(db) -> int:
+    return db.execute(_TAG_VERSION_SQL).fetchone()["version"]
+
+
+def load_tag_trie_snapshot() -> bool:
+    """
+    Serve TAG_TRIE from the mapped snapshot at TAG_SNAPSHOT_PATH if it was
+    taken at the DB's current tag version, less than TAG_SNAPSHOT_MAX_AGE
+    seconds ago. Returns False (and leaves the trie alone) when there is
+    no usable snapshot.
+    """
+    global _trie_stale, _trie_version
+    if not TAG_SNAPSHOT_PATH:
+        return False
+    flat = load_snapshot(TAG_SNAPSHOT_PATH)
+    if flat is None or time.time_ns() - flat.created_at > TAG_SNAPSHOT_MAX_AGE * 1e9:
+        return False
+
+    # cleared before reading so an invalidation during the check is kept
+    _trie_stale = False
+    db = get_db()
+    current = _tag_version(db)
+    if flat.db_version != current:
+        _trie_stale = True
+        return False
+    TAG_TRIE.install(frozen=flat)
+    _trie_version = current
+    return True
+
+
+_last_snapshot = 0.0
+
+
+def save_tag_trie_snapshot(trie, db_version) -> bool:
+    """Write `trie` to TAG_SNAPSHOT_PATH, at most once per TAG_SNAPSHOT_INTERVAL."""
+    global _last_snapshot
+    if not TAG_SNAPSHOT_PATH:
+        return False
+    now = time.monotonic()
+    if _last_snapshot and now - _last_snapshot < TAG_SNAPSHOT_INTERVAL:
+        return False
+    _last_snapshot = now
+    try:
+        write_snapshot(trie, db_version, TAG_SNAPSHOT_PATH)
+    except OSError:
+        # the snapshot is only an optimization
+        log.exception("could not write tag snapshot to %s", TAG_SNAPSHOT_PATH)
+        return False
+    return True
+
+
+def rebuild_tag_trie_from_db(force_snapshot=False):
     """
-    Rebuild the global TAG_TRIE from the current contents of the tags table.
-    Safe to call multiple times.
+    Rebuild the global TAG_TRIE from the current contents of the tags table,
+    carrying each tag's post count from post_tags, and refresh the snapshot.
+    Safe to call multiple times; readers keep seeing the old tree until
+    the new one is swapped in.
     """
+    global _trie_stale, _trie_version, _last_snapshot
+    # cleared before reading so an invalidation during the load is kept
+    _trie_stale = False
+
     db = get_db()
-    rows = db.execute("SELECT tag FROM tags").fetchall()
+    # Read the version before the tags: the rows are then at least as new
+    # as the stamp, and a snapshot is only used while the DB is still
+    # exactly at its stamp, so a stale snapshot is never served.
+    version = _tag_version(db)
+    rows = db.execute(
+        """
+        SELECT t.tag, COUNT(pt.postID) AS refs
+        FROM tags t
+        LEFT JOIN post_tags pt ON pt.tag = t.tag
+        GROUP BY t.tag
+        """
+    ).fetchall()
 
-    TAG_TRIE.clear()
+    fresh = TagTrie()
     for r in rows:
-        TAG_TRIE.insert(r["tag"])
+        fresh.insert(r["tag"], refs=r["refs"])
+    TAG_TRIE.install(root=fresh.root)
+    _trie_version = version
+
+    if force_snapshot:
+        _last_snapshot = 0.0
+    save_tag_trie_snapshot(fresh, version)
+
+
+def lock_tag(db, tag):
+    """
+    Make sure `tag` exists and hold a KEY SHARE lock on it until the
+    caller commits, so delete_orphan_tags() cannot delete it before the
+    caller's post_tags row lands (a foreign-key error otherwise).
+    """
+    while True:
+        db.execute("INSERT INTO tags (tag) VALUES (?) ON CONFLICT (tag) DO NOTHING", (tag,))
+        if db.execute("SELECT 1 FROM tags WHERE tag = ? FOR KEY SHARE", (tag,)).fetchone():
+            return
+        # deleted as an orphan between the two statements; create it again
+
+
+def delete_orphan_tags(db, candidates):
+    """
+    Delete any of `candidates` that no post references any more.
+    Runs inside the caller's transaction; the caller commits and then
+    drops the returned tags from TAG_TRIE.
+    """
+    if not candidates:
+        return []
+
+    # Lock first, skipping tags a create_post holds (see lock_tag): it is
+    # about to reference them. The DELETE then runs on a fresh snapshot, so
+    # it sees every post_tags row committed before the locks were taken; a
+    # single statement could delete a tag (and, by ON DELETE CASCADE, the
+    # post_tags row) that a post committed while it waited.
+    placeholders = ",".join("?" for _ in candidates)
+    locked = db.execute(
+        f"SELECT tag FROM tags WHERE tag IN ({placeholders}) FOR UPDATE SKIP LOCKED",
+        list(candidates),
+    ).fetchall()
+    if not locked:
+        return []
+
+    locked = [r["tag"] for r in locked]
+    placeholders = ",".join("?" for _ in locked)
+    rows = db.execute(
+        f"""
+        DELETE FROM tags t
+        WHERE t.tag IN ({placeholders})
+          AND NOT EXISTS (SELECT 1 FROM post_tags pt WHERE pt.tag = t.tag)
+        RETURNING t.tag
+        """,
+        locked,
+    ).fetchall()
+
+    return [r["tag"] for r in rows]
+
+
+def reconcile_orphan_tags(batch_size=500):
+    """
+    Batch job: delete every tag with no posts (in chunks of `batch_size`,
+    committing between chunks so locks stay short), then rebuild TAG_TRIE
+    so its reference counts match the DB again.
+
+    Returns the list of removed tags.
+    """
+    db = get_db()
+    removed = []
+    while True:
+        candidates = db.execute(
+            """
+            SELECT t.tag
+            FROM tags t
+            WHERE NOT EXISTS (SELECT 1 FROM post_tags pt WHERE pt.tag = t.tag)
+            LIMIT ?
+            FOR UPDATE SKIP LOCKED
+            """,
+            (batch_size,),
+        ).fetchall()
+        removed.extend(delete_orphan_tags(db, [r["tag"] for r in candidates]))
+        db.commit()
+        if len(candidates) < batch_size:
+            break
+
+    if removed:
+        publish(db, "tags")
+        db.commit()
+    rebuild_tag_trie_from_db()
+    return removed
@@ -1,7 +1,8 @@
 # backend/tags.py
-from flask import Blueprint, jsonify
-from db import get_db
-from tag_trie import TAG_TRIE, rebuild_tag_trie_from_db
+from flask import Blueprint, jsonify, request
+from db import get_read_db
+from tag_trie import TAG_TRIE, ensure_tag_trie
+from trending import TRENDING
 
 tags_bp = Blueprint("tags", __name__)
 
@@ -12,7 +13,7 @@ def list_tags():
     Flat list of tags (full paths) in the system.
     Used by your Browse Topics page.
     """
-    db = get_db()
+    db = get_read_db()
     rows = db.execute("SELECT tag FROM tags ORDER BY tag ASC").fetchall()
     return jsonify([r["tag"] for r in rows]), 200
 
@@ -24,7 +25,46 @@ def tags_tree():
     Not required for TopicPage (since we infer subtags from posts),
     but available if you ever want it.
     """
-    # Ensure trie is at least populated from DB once
-    rebuild_tag_trie_from_db()
+    # Ensure trie is populated from DB (and reloaded if another worker changed it)
+    ensure_tag_trie()
     tree = TAG_TRIE.to_nested_dict()
     return jsonify(tree), 200
+
+
+@tags_bp.get("/tags/children")
+def tag_children():
+    """
+    Immediate subtags of a tag with post counts, served from the trie.
+
+      GET /api/tags/children?tag=CS/CS315
+        → {"tag": "CS/CS315",
+           "children": [{"label": "Lab", "fullPath": "CS/CS315/Lab",
+                         "isLeaf": true, "count": 4}, ...]}
+
+    Without ?tag= the top-level tags are returned.
+    """
+    tag = (request.args.get("tag") or "").strip()
+    ensure_tag_trie()
+    return jsonify({"tag": tag, "children": TAG_TRIE.children(tag)}), 200
+
+
+@tags_bp.get("/tags/trending")
+def tags_trending():
+    """
+    Topics visited most in the last few hours (see trending.py), from
+    memory only:
+
+      GET /api/tags/trending?limit=5&prefix=CS
+        → [{"tag": "CS/CS315", "score": 41.7, "error": 0.0}, ...]
+
+    `score` is the time-decayed number of visits; `error` is how much of
+    it may be overcounted.
+    """
+    prefix = (request.args.get("prefix") or "").strip()
+    try:
+        limit = int(request.args.get("limit", "10"))
+    except ValueError:
+        return jsonify({"error": "Invalid limit parameter"}), 400
+    if not 1 <= limit <= TRENDING.capacity:
+        return jsonify({"error": f"limit must be between 1 and {TRENDING.capacity}"}), 400
+    return jsonify(TRENDING.top(limit, prefix)), 200
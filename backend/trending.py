@@ -0,0 +1,115 @@
+# backend/trending.py
+"""
+Trending topics from recent-topics traffic.
+
+Every POST /api/recent-topics is a vote for a topic. We feed those votes
+into a Space-Saving sketch (Metwally et al.): a fixed number of counters,
+TRENDING_CAPACITY, no matter how many users or tags there are. A tag that
+is not tracked takes over the smallest counter and inherits its count as
+possible overcount (`error`), so any tag with more than total/capacity
+votes is guaranteed to be tracked.
+
+Votes fade with a half-life of TRENDING_HALF_LIFE seconds, so "trending"
+means recently popular rather than popular ever. Instead of shrinking
+every counter as time passes, each new vote is weighted up by
+2 ** (elapsed / half_life) ("forward decay"); scores are divided by the
+current weight when read. Weights are rescaled now and then so they stay
+small.
+
+    TRENDING.record("CS/CS315")
+    TRENDING.top(10)   # [{"tag": "CS/CS315", "score": 41.7, "error": 0.0}, ...]
+
+Counts are per worker process. With several workers each sees a share of
+the traffic, which is enough to rank topics.
+"""
+import heapq
+import os
+import threading
+import time
+
+TRENDING_CAPACITY = int(os.getenv("TRENDING_CAPACITY", "256"))
+TRENDING_HALF_LIFE = float(os.getenv("TRENDING_HALF_LIFE", "3600"))
+
+# rescale once weights pass 2**40, long before float precision suffers
+_RESCALE_AT = 40
+
+
+class SpaceSaving:
+    def __init__(self, capacity=TRENDING_CAPACITY, half_life=TRENDING_HALF_LIFE, clock=time.monotonic):
+        self.capacity = capacity
+        self.half_life = half_life
+        self._clock = clock
+        self._landmark = clock()   # time at which a vote weighs 1
+        self._counts = {}          # tag -> [weighted count, weighted error]
+        # (count, tag) per tracked tag, for finding the smallest counter.
+        # Counts only grow, so an entry may be stale (too small); it is
+        # corrected when it reaches the top.
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def _weight(self, now):
+        return 2.0 ** ((now - self._landmark) / self.half_life)
+
+    def _rescale(self, now):
+        factor = self._weight(now)
+        for c in self._counts.values():
+            c[0] /= factor
+            c[1] /= factor
+        self._heap = [(c[0], t) for t, c in self._counts.items()]
+        heapq.heapify(self._heap)
+        self._landmark = now
+
+    def record(self, tag, votes=1):
+        now = self._clock()
+        with self._lock:
+            if (now - self._landmark) / self.half_life > _RESCALE_AT:
+                self._rescale(now)
+            w = votes * self._weight(now)
+
+            c = self._counts.get(tag)
+            if c is not None:
+                c[0] += w
+            elif len(self._counts) < self.capacity:
+                self._counts[tag] = [w, 0.0]
+                heapq.heappush(self._heap, (w, tag))
+            else:
+                # evict the smallest counter; the newcomer may have had up
+                # to that many votes we never saw
+                while True:
+                    count, victim = self._heap[0]
+                    current = self._counts[victim][0]
+                    if current == count:
+                        break
+                    heapq.heapreplace(self._heap, (current, victim))
+                del self._counts[victim]
+                self._counts[tag] = [count + w, count]
+                heapq.heapreplace(self._heap, (count + w, tag))
+
+    def top(self, n=10, prefix=""):
+        """
+        The `n` highest scoring tags (optionally only `prefix` and below),
+        as {"tag", "score", "error"} with scores in votes at today's weight.
+        """
+        with self._lock:
+            scale = self._weight(self._clock())
+            items = [(t, c[0], c[1]) for t, c in self._counts.items()]
+
+        # votes that have all but faded away are not trending
+        items = [i for i in items if i[1] / scale >= 0.01]
+        if prefix:
+            items = [i for i in items if i[0] == prefix or i[0].startswith(prefix + "/")]
+        items.sort(key=lambda i: i[1], reverse=True)
+        return [
+            {"tag": t, "score": round(count / scale, 2), "error": round(err / scale, 2)}
+            for t, count, err in items[:n]
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+            self._heap.clear()
+            self._landmark = self._clock()
+
+
+# Single global sketch fed by recent.recent_add
+TRENDING = SpaceSaving()
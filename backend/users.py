@@ -1,7 +1,7 @@
 # backend/users.py
 import json
-from flask import Blueprint, jsonify
-from db import get_db
+from flask import Blueprint, g, jsonify
+from db import get_db, get_read_db
 from auth import requires_auth, current_user, HANDLE_CLAIM
 
 users_bp = Blueprint("users", __name__)
@@ -40,20 +40,24 @@ def auto_register_user():
 
     # Single upsert: create the row if missing, update handle/email if it exists,
     # and make sure our JSON-ish text fields are never NULL.
-    db.execute(
-        """
-        INSERT INTO users (sub, handle, email, created_posts, bookmarks, recent_history)
-        VALUES (?, ?, ?, '[]', '[]', '[]')
-        ON CONFLICT(sub) DO UPDATE
-        SET handle = EXCLUDED.handle,
-            email  = EXCLUDED.email,
-            created_posts   = COALESCE(users.created_posts, '[]'),
-            bookmarks       = COALESCE(users.bookmarks, '[]'),
-            recent_history  = COALESCE(users.recent_history, '[]')
-        """,
-        (sub, handle, email),
-    )
-    db.commit()
+    # Once per request (calls batched by /api/batch share g); the row is
+    # still re-read below since an earlier call may have changed it.
+    if g.get("_registered_sub") != sub:
+        db.execute(
+            """
+            INSERT INTO users (sub, handle, email, created_posts, bookmarks, recent_history)
+            VALUES (?, ?, ?, '[]', '[]', '[]')
+            ON CONFLICT(sub) DO UPDATE
+            SET handle = EXCLUDED.handle,
+                email  = EXCLUDED.email,
+                created_posts   = COALESCE(users.created_posts, '[]'),
+                bookmarks       = COALESCE(users.bookmarks, '[]'),
+                recent_history  = COALESCE(users.recent_history, '[]')
+            """,
+            (sub, handle, email),
+        )
+        db.commit()
+        g._registered_sub = sub
 
     row = db.execute("SELECT * FROM users WHERE sub = ?", (sub,)).fetchone()
     return row
@@ -149,7 +153,7 @@ def me_posts():
 @users_bp.get("/profile/<handle>")
 def profile(handle):
     """Public endpoint: fetch user and their posts by handle."""
-    db = get_db()
+    db = get_read_db()
     user = db.execute(
         "SELECT * FROM users WHERE handle = ?", (handle,)
     ).fetchone()
@@ -0,0 +1,16 @@
+# backend/wsgi.py
+"""
+WSGI entry point for production servers:
+
+    gunicorn -c gunicorn.conf.py
+
+Importing this module only builds the app (flask's CLI imports it too, so
+it must not need a database). gunicorn.conf.py preloads it in the master
+process and runs app.warmup() there before forking, so schema setup, the
+TAG_TRIE load and the JWKS fetch happen once and the workers inherit the
+loaded trie. With TAG_SNAPSHOT_PATH set the load is a memory map of the
+last snapshot (when it is still current), so workers share its pages.
+"""
+from app import create_app
+
+app = create_app()
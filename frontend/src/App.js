@@ -9,6 +9,7 @@ import MainMenu from './pages/mainmenu';
 import TopicBrowse from './pages/topicPage'; // your "Browse topics" page
 import UserPage from './pages/userpage';
 import { getOrCreateUserKey } from './utils/userKey';
+import { apiFetch } from './api';
 
 const API_BASE = "http://localhost:5000"; // adjust if needed
 
@@ -47,7 +48,7 @@ function Router() {
 
     (async () => {
       try {
-        await fetch(`${API_BASE}/api/recent-topics`, {
+        await apiFetch(`${API_BASE}/api/recent-topics`, {
           method: 'POST',
           headers: { 'Content-Type': 'application/json' },
           body: JSON.stringify({ user: userKey, tag }),
@@ -1,11 +1,47 @@
 import { useAuth0 } from "@auth0/auth0-react";
 
+// After a write the backend answers with X-Read-After (the primary DB's
+// WAL position); sending it back for a while keeps this tab's reads on the
+// primary until the read replica has caught up with it, so a lagging
+// replica cannot hide the user's own change.
+const READ_AFTER_HEADER = "X-Read-After";
+const READ_AFTER_KEY = "readAfter";
+const READ_AFTER_WINDOW_MS = 60 * 1000;
+
+function readAfterStamp() {
+  try {
+    const saved = JSON.parse(sessionStorage.getItem(READ_AFTER_KEY) || "null");
+    if (saved && Date.now() - saved.at < READ_AFTER_WINDOW_MS) return saved.stamp;
+  } catch (e) {
+    // storage unavailable or corrupt; reads just go wherever the server picks
+  }
+  return null;
+}
+
+// fetch() that carries the read-after stamp both ways
+export async function apiFetch(url, options = {}) {
+  const stamp = readAfterStamp();
+  const headers = stamp
+    ? { ...(options.headers || {}), [READ_AFTER_HEADER]: stamp }
+    : options.headers;
+  const res = await fetch(url, { ...options, headers });
+  const wrote = res.headers.get(READ_AFTER_HEADER);
+  if (wrote) {
+    try {
+      sessionStorage.setItem(READ_AFTER_KEY, JSON.stringify({ stamp: wrote, at: Date.now() }));
+    } catch (e) {
+      // not fatal: only read-your-writes with a replica depends on it
+    }
+  }
+  return res;
+}
+
 export function useApi(baseUrl = "http://localhost:5000") {
   const { getAccessTokenSilently } = useAuth0();
 
   return async (path, options = {}) => {
     const token = await getAccessTokenSilently();
-    const res = await fetch(`${baseUrl}${path}`, {
+    const res = await apiFetch(`${baseUrl}${path}`, {
       ...options,
       headers: {
         "Content-Type": "application/json",
@@ -9,6 +9,7 @@ import React, {
 import { useAuth0 } from "@auth0/auth0-react";
 import { getOrCreateUserKey } from "../utils/userKey";
 import HeaderBar from "../components/HeaderBar";
+import { apiFetch } from "../api";
 
 const API_BASE = "http://localhost:5000/api";
 
@@ -80,7 +81,7 @@ export default function MainMenu() {
     const requestedKey = ukey;
 
     try {
-      const res = await fetch(
+      const res = await apiFetch(
         `${API_BASE}/recent-topics?user=${encodeURIComponent(requestedKey)}`
       );
       const data = await res.json();
@@ -122,7 +123,7 @@ export default function MainMenu() {
   // Save recent topics to database once they are loaded
   useEffect(() => {
     if (isAuthenticated && userKey && recent.length > 0) {
-      fetch(`${API_BASE}/recent-topics/save`, {
+      apiFetch(`${API_BASE}/recent-topics/save`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
@@ -5,6 +5,7 @@ import DOMPurify from "dompurify";
 import PostEditor from "../components/PostEditor";
 import HeaderBar from "../components/HeaderBar";
 import { getOrCreateUserKey } from "../utils/userKey";
+import { apiFetch } from "../api";
 
 const API_BASE = "http://localhost:5000";
 
@@ -45,137 +46,71 @@ export default function TopicPage({ topic }) {
   }, [isAuthenticated, user]);
 
   // -------------------------------------------------
-  // Fetch posts for this topic (parent sees all descendants)
+  // Load the page in one round trip (POST /api/batch): posts for this
+  // topic (parent sees all descendants), subtopic chips, and recording
+  // the topic in recents. When logged in, the token makes each post
+  // carry is_bookmarked, so bookmarks need no separate request.
   // -------------------------------------------------
-  const fetchPosts = useCallback(async () => {
-    try {
-      const res = await fetch(
-        `${API_BASE}/api/posts?tag=${encodeURIComponent(topic)}`
-      );
-      const data = await res.json();
-      setPosts(Array.isArray(data) ? data : []);
-    } catch (err) {
-      console.error("Failed to load posts", err);
-    }
-  }, [topic]);
-
-  useEffect(() => {
-    fetchPosts();
-  }, [fetchPosts]);
-
-  // -------------------------------------------------
-  // Record this topic in recents
-  // -------------------------------------------------
-  const recordRecentTopic = useCallback(async () => {
+  const loadPage = useCallback(async () => {
     if (!userKey || !topic) return;
 
-    try {
-      await fetch(`${API_BASE}/api/recent-topics`, {
+    const tag = encodeURIComponent(topic);
+    const requests = [
+      { id: "posts", path: `/api/posts?tag=${tag}` },
+      { id: "subtags", path: `/api/tags/children?tag=${tag}` },
+      {
+        id: "recent",
         method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ user: userKey, tag: topic }),
-      });
-    } catch (err) {
-      console.error("Failed to record recent topic", err);
-    }
-  }, [userKey, topic]);
-
-  useEffect(() => {
-    recordRecentTopic();
-  }, [recordRecentTopic]);
-
-  // -------------------------------------------------
-  // Compute subtags from current posts (for chips under search)
-  // -------------------------------------------------
-  useEffect(() => {
-    // Reset leaf filter whenever topic or posts change
-    setActiveTagFilter(null);
-
-    const allTags = new Set();
-    posts.forEach((p) => {
-      (p.tags || []).forEach((t) => allTags.add(t));
-    });
-
-    const tagsArray = Array.from(allTags);
-    if (!tagsArray.length) {
-      setSubtags([]);
-      return;
-    }
-
-    const topicSegs = (topic || "")
-      .split("/")
-      .map((s) => s.trim())
-      .filter(Boolean);
-    const depth = topicSegs.length;
-
-    const childrenMap = {};
-
-    tagsArray.forEach((tag) => {
-      const segs = (tag || "")
-        .split("/")
-        .map((s) => s.trim())
-        .filter(Boolean);
-      if (segs.length <= depth) return;
-
-      // Must share prefix with the current topic
-      for (let i = 0; i < depth; i++) {
-        if (segs[i] !== topicSegs[i]) return;
+        path: "/api/recent-topics",
+        body: { user: userKey, tag: topic },
+      },
+    ];
+    const headers = { "Content-Type": "application/json" };
+
+    if (isAuthenticated) {
+      try {
+        const token = await getAccessTokenSilently();
+        headers.Authorization = `Bearer ${token}`;
+      } catch (err) {
+        // expired or logged-out session: load the page anonymously
+        console.warn("No access token; loading topic without bookmarks", err);
       }
+    }
 
-      const childSeg = segs[depth];
-      const childPath = [...topicSegs, childSeg].join("/");
+    try {
+      const res = await apiFetch(`${API_BASE}/api/batch`, {
+        method: "POST",
+        headers,
+        body: JSON.stringify({ requests }),
+      });
+      const data = await res.json();
 
-      if (!childrenMap[childPath]) {
-        childrenMap[childPath] = {
-          label: childSeg,
-          fullPath: childPath,
-          isLeaf: true,
-        };
+      const results = {};
+      for (const r of data.responses || []) {
+        if (r.status === 200) results[r.id] = r.body;
       }
-    });
-
-    const childList = Object.values(childrenMap);
 
-    // Detect which child paths have descendants (non-leaf)
-    childList.forEach((child) => {
-      const prefix = child.fullPath + "/";
-      const hasDescendant = tagsArray.some(
-        (t) => t !== child.fullPath && t.startsWith(prefix)
+      const loaded = Array.isArray(results.posts) ? results.posts : [];
+      setPosts(loaded);
+      setSubtags(
+        Array.isArray(results.subtags?.children) ? results.subtags.children : []
+      );
+      setBookmarkedIds(
+        new Set(loaded.filter((p) => p.is_bookmarked).map((p) => p.postID))
       );
-      child.isLeaf = !hasDescendant;
-    });
-
-    childList.sort((a, b) => a.label.localeCompare(b.label));
-    setSubtags(childList);
-  }, [posts, topic]);
-
-  // -------------------------------------------------
-  // Load bookmarks for user
-  // -------------------------------------------------
-  const loadBookmarks = useCallback(async () => {
-    if (!isAuthenticated) {
-      setBookmarkedIds(new Set());
-      return;
-    }
-    try {
-      const token = await getAccessTokenSilently();
-      const res = await fetch(`${API_BASE}/api/bookmarks`, {
-        headers: {
-          Authorization: `Bearer ${token}`,
-        },
-      });
-      if (!res.ok) return;
-      const data = await res.json();
-      const ids = Array.isArray(data.ids) ? data.ids : [];
-      setBookmarkedIds(new Set(ids));
     } catch (err) {
-      console.error("Failed to load bookmarks", err);
+      console.error("Failed to load topic page", err);
     }
-  }, [isAuthenticated, getAccessTokenSilently]);
+  }, [topic, userKey, isAuthenticated, getAccessTokenSilently]);
 
   useEffect(() => {
-    loadBookmarks();
-  }, [loadBookmarks]);
+    loadPage();
+  }, [loadPage]);
+
+  // Reset leaf filter whenever topic or posts change
+  useEffect(() => {
+    setActiveTagFilter(null);
+  }, [posts, topic]);
 
   const isBookmarked = (postID) => bookmarkedIds.has(postID);
 
@@ -193,7 +128,7 @@ export default function TopicPage({ topic }) {
 
     try {
       const token = await getAccessTokenSilently();
-      const res = await fetch(
+      const res = await apiFetch(
         `${API_BASE}/api/bookmarks/${post.postID}`,
         {
           method,
@@ -290,7 +225,7 @@ export default function TopicPage({ topic }) {
         tagsToSend.push(trimmedTopic);
       }
 
-      const res = await fetch(`${API_BASE}/api/posts`, {
+      const res = await apiFetch(`${API_BASE}/api/posts`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -315,8 +250,7 @@ export default function TopicPage({ topic }) {
       setCustomTag("");
       setOpen(false);
 
-      await fetchPosts();
-      recordRecentTopic();
+      await loadPage();
     } finally {
       setBusy(false);
     }
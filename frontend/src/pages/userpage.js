@@ -3,8 +3,10 @@ import React, { useEffect, useState, useCallback } from "react";
 import { useAuth0 } from "@auth0/auth0-react";
 import DOMPurify from "dompurify";
 import HeaderBar from "../components/HeaderBar";
+import { apiFetch } from "../api";
 
 const API_BASE = "http://localhost:5000";
+const BY_IDS_CHUNK = 200;
 
 export default function UserPage() {
   const { isAuthenticated, getAccessTokenSilently, user, loginWithRedirect } =
@@ -35,7 +37,7 @@ export default function UserPage() {
     try {
       const token = await getAccessTokenSilently();
 
-      const meRes = await fetch(`${API_BASE}/api/me`, {
+      const meRes = await apiFetch(`${API_BASE}/api/me`, {
         headers: { Authorization: `Bearer ${token}` },
       });
 
@@ -61,11 +63,25 @@ export default function UserPage() {
         return;
       }
 
-      const postsRes = await fetch(
-        `${API_BASE}/api/posts/by_ids?ids=${unified.join(",")}`
+      // the server takes at most BY_IDS_MAX (200) ids per call
+      const chunks = [];
+      for (let i = 0; i < unified.length; i += BY_IDS_CHUNK) {
+        chunks.push(unified.slice(i, i + BY_IDS_CHUNK));
+      }
+      const pages = await Promise.all(
+        chunks.map(async (ids) => {
+          const postsRes = await apiFetch(`${API_BASE}/api/posts/by_ids`, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ ids }),
+          });
+          if (!postsRes.ok) {
+            throw new Error(`by_ids failed: ${postsRes.status}`);
+          }
+          return postsRes.json();
+        })
       );
-      const posts = await postsRes.json();
-      const byId = new Map(posts.map((p) => [p.postID, p]));
+      const byId = new Map(pages.flat().map((p) => [p.postID, p]));
 
       setCreatedPosts(createdIds.map((id) => byId.get(id)).filter(Boolean));
       setBookmarkedPosts(bookmarkIds.map((id) => byId.get(id)).filter(Boolean));
@@ -96,7 +112,7 @@ export default function UserPage() {
 
     try {
       const token = await getAccessTokenSilently();
-      const res = await fetch(`${API_BASE}/api/bookmarks/${post.postID}`, {
+      const res = await apiFetch(`${API_BASE}/api/bookmarks/${post.postID}`, {
         method,
         headers: { Authorization: `Bearer ${token}` },
       });